@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import numpy as np
+from kinetics.cache import excitation_cache, excitation_runs
+from kinetics.plotting import plot_kinetics
+from kinetics.propagator import ENGINES
+from kinetics.storage import kinetics_data_path, save_kinetics_data
+from kinetics.yields import QuantumYieldCalculator
+from states2 import s2QuantumYieldCalculator
+from states3 import s3QuantumYieldCalculator
+from .common import max_relative_error, model_setup, reference_data, run_module
+
+CLOSED_FORM_YIELDS = {2: s2QuantumYieldCalculator, 3: s3QuantumYieldCalculator}
+
+
+class Yields:
+    params = ([2, 3, 4, 5], ['numeric', 'symbolic'])
+    param_names = ['model', 'method']
+
+    def setup(self, n_states, method):
+        self.model, self.inputs, self.rate_constants = model_setup(n_states)
+
+    def time_calculate(self, n_states, method):
+        calculator = QuantumYieldCalculator(self.rate_constants, model=self.model, symbolic=method == 'symbolic')
+        calculator.calculate_quantum_yield()
+
+    def time_closed_form(self, n_states, method):
+        # the original two- and three-state calculators, for comparison with the generic one
+        if n_states not in CLOSED_FORM_YIELDS or method != 'numeric':
+            raise NotImplementedError
+        CLOSED_FORM_YIELDS[n_states](**self.rate_constants)._calculate_quantum_yield()
+
+
+class Output:
+    # plotting and data export of the reference curves, independent of the solvers
+    params = ([2, 3, 4, 5],)
+    param_names = ['model']
+    number = 1
+    repeat = (1, 5, 30.0)
+
+    def setup(self, n_states):
+        self.data = reference_data(n_states)
+        self.folder = tempfile.mkdtemp(prefix='kinluv-bench-')
+
+    def teardown(self, n_states):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _curves(self):
+        data = self.data
+        return data['states'], data['t_excitation'], data['y_excitation'], data['t_decay'], data['y_decay']
+
+    def time_plot_pdf(self, n_states):
+        plot_kinetics(*self._curves(), fig_path=os.path.join(self.folder, 'kinetics_plot.pdf'))
+
+    def time_plot_png(self, n_states):
+        plot_kinetics(*self._curves(), fig_path=os.path.join(self.folder, 'kinetics_plot.png'))
+
+    def time_export_text(self, n_states):
+        save_kinetics_data(kinetics_data_path(self.folder, 'text'), *self._curves(), data_format='text')
+
+    def time_export_npz(self, n_states):
+        save_kinetics_data(kinetics_data_path(self.folder, 'npz'), *self._curves(), data_format='npz')
+
+    def time_export_raw(self, n_states):
+        save_kinetics_data(kinetics_data_path(self.folder, 'raw'), *self._curves(), data_format='raw')
+
+    def track_text_size(self, n_states):
+        data_path = kinetics_data_path(self.folder, 'text')
+        save_kinetics_data(data_path, *self._curves(), data_format='text')
+        return os.path.getsize(data_path)
+
+    track_text_size.unit = 'bytes'
+
+
+class FullRun:
+    # the statesN entry points end to end, logging and data file included
+    params = ([2, 3, 4, 5], list(ENGINES))
+    param_names = ['model', 'engine']
+    number = 1
+    repeat = (1, 3, 120.0)
+    timeout = 900
+
+    def setup(self, n_states, engine):
+        # the two- and three-state models are closed-form, they run once under the default engine
+        if n_states < 4 and engine != 'radau':
+            raise NotImplementedError
+        self.folder = tempfile.mkdtemp(prefix='kinluv-bench-')
+
+    def teardown(self, n_states, engine):
+        shutil.rmtree(self.folder, ignore_errors=True)
+        # every repeat solves its own excitation phase instead of taking the previous one's
+        excitation_cache.clear()
+        excitation_runs.clear()
+
+    def time_run(self, n_states, engine):
+        run_module(n_states, self.folder, engine=engine)
+
+    def peakmem_run(self, n_states, engine):
+        run_module(n_states, self.folder, engine=engine)
+
+
+class Agreement:
+    # a speedup must not change the physics: every engine is held against the stored
+    # examples/results_*/kinetics_data.out, a benchmark above the tolerance fails
+    params = ([2, 3, 4, 5], list(ENGINES))
+    param_names = ['model', 'engine']
+    number = 1
+    repeat = 1
+    timeout = 900
+    # the reference files are written with seven significant digits
+    tolerance = 1e-4
+
+    def setup(self, n_states, engine):
+        if n_states < 4 and engine != 'radau':
+            raise NotImplementedError
+        self.folder = tempfile.mkdtemp(prefix='kinluv-bench-')
+
+    def teardown(self, n_states, engine):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def track_max_relative_error(self, n_states, engine):
+        result = run_module(n_states, self.folder, engine=engine)
+        data = {name: result.array(name) for name in ('t_excitation', 'y_excitation', 't_decay', 'y_decay')}
+        error = max_relative_error(data, reference_data(n_states))
+        if not np.isfinite(error) or error > self.tolerance:
+            raise AssertionError(f"{n_states}-state {engine} run deviates from the reference by {error:.2e}")
+        return error
+
+    track_max_relative_error.unit = 'relative error'
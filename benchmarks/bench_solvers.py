@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from kinetics.cache import excitation_cache
+from kinetics.grids import fixed_decay_grid, fixed_excitation_grid, model_time_grid, split_grid
+from kinetics.propagator import ENGINES, MatrixExponentialPropagator
+from kinetics.solvers import DecaySolver, ExcitationSolver
+from states2 import s2DecaySolver, s2ExcitationSolver
+from states3 import s3DecaySolver, s3ExcitationSolver
+from .common import VARIANTS, max_relative_error, model_setup
+
+CLOSED_FORM_SOLVERS = {2: (s2ExcitationSolver, s2DecaySolver), 3: (s3ExcitationSolver, s3DecaySolver)}
+
+
+def excitation_grid(params):
+    return fixed_excitation_grid(params['time_excitation'])
+
+
+def decay_grid(params):
+    return fixed_decay_grid(params['time_decay'])
+
+
+def _skip_slow_radau(engine, variant):
+    # Radau keeps max_step at 1e-8 s in the decay, so only the example window finishes in reasonable time
+    if engine == 'radau' and variant != 'example':
+        raise NotImplementedError
+
+
+class ExcitationSolve:
+    params = ([4, 5], list(ENGINES), list(VARIANTS))
+    param_names = ['model', 'engine', 'variant']
+    number = 1
+    repeat = (1, 5, 60.0)
+    timeout = 600
+
+    def setup(self, n_states, engine, variant):
+        self.model, self.inputs, self.rate_constants = model_setup(n_states, variant)
+        self.t_eval = excitation_grid(self.inputs)
+
+    def time_solve(self, n_states, engine, variant):
+        solver = ExcitationSolver(self.inputs['time_pulse'], self.inputs['num_photon'], model=self.model, **self.rate_constants)
+        solver.solve_numerically(t_span=(0, self.inputs['time_excitation']), t_eval=self.t_eval, engine=engine)
+        solver.get_solution_at_time()
+
+    def time_solve_pulse(self, n_states, engine, variant):
+        # excitation_mode='pulse+tail': integrated up to the pulse end, the rest of the window propagated exactly
+        t_pulse, t_tail = split_grid(self.t_eval, self.inputs['time_pulse'])
+        solver = ExcitationSolver(self.inputs['time_pulse'], self.inputs['num_photon'], model=self.model, **self.rate_constants)
+        solver.solve_numerically(t_span=(0, self.inputs['time_pulse']), t_eval=t_pulse, engine=engine)
+        solver.propagate_after_pulse(t_tail)
+
+
+class DecaySolve:
+    params = ([4, 5], list(ENGINES), list(VARIANTS))
+    param_names = ['model', 'engine', 'variant']
+    number = 1
+    repeat = (1, 3, 120.0)
+    timeout = 900
+
+    def setup(self, n_states, engine, variant):
+        _skip_slow_radau(engine, variant)
+        self.model, self.inputs, self.rate_constants = model_setup(n_states, variant)
+        self.t_eval = decay_grid(self.inputs)
+        excitation = ExcitationSolver(self.inputs['time_pulse'], self.inputs['num_photon'], model=self.model, **self.rate_constants)
+        excitation.solve_numerically(t_span=(0, self.inputs['time_excitation']), t_eval=excitation_grid(self.inputs), engine='expm')
+        self.y0 = excitation.get_solution_at_time()
+
+    def time_solve(self, n_states, engine, variant):
+        solver = DecaySolver(self.inputs['time_pulse'], self.inputs['num_photon'], model=self.model, **self.rate_constants)
+        solver.solve_numerically(t_span=(0, self.inputs['time_decay']), y0=self.y0, t_eval=self.t_eval, engine=engine)
+
+    def time_solve_from_cache(self, n_states, engine, variant):
+        # the pulse-end populations come from the excitation cache after the first repeat
+        solver = DecaySolver(self.inputs['time_pulse'], self.inputs['num_photon'], model=self.model, **self.rate_constants)
+        solver.solve_numerically(
+            t_span=(0, self.inputs['time_decay']), t_eval=self.t_eval, t_span_excitation=(0, self.inputs['time_excitation']),
+            t_eval_excitation=excitation_grid(self.inputs), rate_constants=self.rate_constants, engine=engine
+        )
+
+    def teardown(self, n_states, engine, variant):
+        excitation_cache.clear()
+
+
+class ClosedFormSolve:
+    # the two- and three-state models evaluate the cached parametric solution instead of integrating
+    params = ([2, 3], list(VARIANTS))
+    param_names = ['model', 'variant']
+
+    def setup(self, n_states, variant):
+        self.model, self.inputs, self.rate_constants = model_setup(n_states, variant)
+        self.kwargs = dict(self.rate_constants, time_pulse=self.inputs['time_pulse'], num_photon=self.inputs['num_photon'])
+        self.t_excitation = np.logspace(-15, np.log10(self.inputs['time_excitation']), 10000)
+        self.t_decay = np.logspace(-12, np.log10(self.inputs['time_decay']), 10000)
+        # the symbolic solution is derived once per cache directory, not per repeat
+        excitation_class, decay_class = CLOSED_FORM_SOLVERS[n_states]
+        excitation_class(**self.kwargs).evaluate(self.t_excitation)
+        decay_class(**self.kwargs).evaluate(self.t_decay)
+
+    def time_excitation(self, n_states, variant):
+        solver = CLOSED_FORM_SOLVERS[n_states][0](**self.kwargs)
+        solver.get_solution_at_time()
+        solver.evaluate(self.t_excitation)
+
+    def time_decay(self, n_states, variant):
+        CLOSED_FORM_SOLVERS[n_states][1](**self.kwargs).evaluate(self.t_decay)
+
+
+class DecayFit:
+    params = ([4, 5], ['varpro', 'legacy'])
+    param_names = ['model', 'method']
+    number = 1
+    repeat = (1, 5, 60.0)
+    timeout = 600
+
+    def setup(self, n_states, method):
+        self.model, self.inputs, self.rate_constants = model_setup(n_states)
+        self.solver = DecaySolver(self.inputs['time_pulse'], self.inputs['num_photon'], model=self.model, **self.rate_constants)
+        excitation = ExcitationSolver(self.inputs['time_pulse'], self.inputs['num_photon'], model=self.model, **self.rate_constants)
+        excitation.solve_numerically(t_span=(0, self.inputs['time_excitation']), t_eval=excitation_grid(self.inputs), engine='expm')
+        solution = self.solver.solve_numerically(
+            t_span=(0, self.inputs['time_decay']), y0=excitation.get_solution_at_time(), t_eval=decay_grid(self.inputs), engine='expm'
+        )
+        self.t_data = solution.t
+        self.s1_data = solution.y[self.model.index(self.model.emissive_state)]
+
+    def time_fit(self, n_states, method):
+        self.solver.fit_s1_with_two_exponentials(self.t_data, self.s1_data, method=method)
+
+
+class Grids:
+    # points kept by the uneven grids and how well straight lines in log time between them
+    # reproduce the exact decay on the dense fixed grid
+    params = ([4, 5], ['timescales', 'adaptive'], list(VARIANTS))
+    param_names = ['model', 'grid', 'variant']
+
+    def setup(self, n_states, grid, variant):
+        self.model, self.inputs, self.rate_constants = model_setup(n_states, variant)
+        A = self.model.rate_matrix(self.rate_constants, excitation=False)
+        self.propagator = MatrixExponentialPropagator(A)
+        self.y0 = MatrixExponentialPropagator(self.model.rate_matrix(self.rate_constants, excitation=True)).propagate(
+            self.model.initial_populations(self.inputs['num_photon']), self.inputs['time_pulse']
+        )
+
+    def _grid(self, grid):
+        return model_time_grid(self.model, self.rate_constants, 'decay', self.inputs['time_decay'], y0=self.y0, grid=grid)
+
+    def time_grid(self, n_states, grid, variant):
+        self._grid(grid)
+
+    def track_points(self, n_states, grid, variant):
+        return self._grid(grid).size
+
+    track_points.unit = 'points'
+
+    def track_interpolation_error(self, n_states, grid, variant):
+        t_grid = self._grid(grid)
+        t_dense = fixed_decay_grid(self.inputs['time_decay'])
+        exact = self.propagator.propagate(self.y0, t_dense)
+        data = {
+            't_excitation': t_dense[:2], 'y_excitation': exact[:, :2],
+            't_decay': t_grid, 'y_decay': self.propagator.propagate(self.y0, t_grid),
+        }
+        reference = {'t_excitation': t_dense[:2], 'y_excitation': exact[:, :2], 't_decay': t_dense, 'y_decay': exact}
+        return max_relative_error(data, reference)
+
+    track_interpolation_error.unit = 'relative error'
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import os
+import importlib
+import numpy as np
+from kinetics.model import MODELS
+from kinetics.storage import load_kinetics_data
+from main import MODULES, filter_params, read_params_from_inp
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+# 'example' is examples/inp as it is, 'stiff' makes every fast non-radiative channel a hundred times
+# faster, 'long' follows the decay for a full second
+VARIANTS = ('example', 'stiff', 'long')
+STIFF_FACTOR = 100.0
+STIFF_THRESHOLD = 1e8
+LONG_TIME_DECAY = 1.0
+
+# populations are compared relative to their size, below the floor absolutely
+AGREEMENT_FLOOR = 1e-10
+
+
+def load_params(variant='example'):
+    if variant not in VARIANTS:
+        raise ValueError(f"Unknown variant '{variant}', choose one of {VARIANTS}.")
+    params = read_params_from_inp(os.path.join(EXAMPLES, 'inp'))
+    if variant == 'stiff':
+        for key, value in params.items():
+            if key.startswith('k_') and not key.startswith('k_abs') and value >= STIFF_THRESHOLD:
+                params[key] = value * STIFF_FACTOR
+    elif variant == 'long':
+        params['time_decay'] = LONG_TIME_DECAY
+    return params
+
+
+def rate_constants(model, params):
+    return {name: params[name] for name in model.rate_names}
+
+
+def model_setup(n_states, variant='example'):
+    model = MODELS[n_states]
+    params = load_params(variant)
+    return model, params, rate_constants(model, params)
+
+
+def run_module(n_states, results_folder, variant='example', **options):
+    # one full run of the statesN entry point, quiet and without figures unless asked for
+    params = load_params(variant)
+    params.update({'quiet': True, 'plot': False, 'results_folder': results_folder})
+    params.update(options)
+    module = importlib.import_module(MODULES[n_states])
+    return module.main(**filter_params(module.main, params))
+
+
+def reference_data(n_states):
+    return load_kinetics_data(os.path.join(EXAMPLES, f'results_{n_states}states', 'kinetics_data.out'))
+
+
+def _on_grid(t_values, y_values, t_reference):
+    # a run on a different time grid is interpolated in log time onto the reference times
+    t_values = np.asarray(t_values)
+    if t_values.shape == t_reference.shape and np.allclose(t_values, t_reference, rtol=1e-4, atol=0):
+        return np.asarray(y_values)
+    log_t = np.log10(np.maximum(t_values, 1e-300))
+    log_reference = np.log10(np.maximum(t_reference, 1e-300))
+    return np.array([np.interp(log_reference, log_t, row) for row in np.asarray(y_values)])
+
+
+def max_relative_error(data, reference):
+    # worst deviation over both phases and every state
+    errors = []
+    for phase in ('excitation', 'decay'):
+        t_reference = reference['t_' + phase]
+        y_reference = reference['y_' + phase]
+        y_values = _on_grid(data['t_' + phase], data['y_' + phase], t_reference)
+        errors.append(np.max(np.abs(y_values - y_reference) / (np.abs(y_reference) + AGREEMENT_FLOOR)))
+    return float(max(errors))
@@ -0,0 +1,17 @@
+from .model import *
+from .propagator import *
+from .cache import *
+from .storage import *
+from .logs import *
+from .fitting import *
+from .decay_analysis import *
+from .symbolic import *
+from .solvers import *
+from .yields import *
+from .lifetimes import *
+from .results import *
+from .profiling import *
+from .plotting import *
+from .grids import *
+from .pipeline import *
+from .sweep import *
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+
+
+class PopulationCache:
+    # least-recently-used memo of pulse-end populations
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._store = OrderedDict()
+
+    @staticmethod
+    def make_key(rate_constants, time_pulse, num_photon, **options):
+        return (
+            tuple(sorted((key, float(value)) for key, value in rate_constants.items())),
+            float(time_pulse),
+            float(num_photon),
+            tuple(sorted(options.items())),
+        )
+
+    def get_or_compute(self, key, compute, freeze=True):
+        if key in self._store:
+            self.hits += 1
+            self._store.move_to_end(key)
+            return self._store[key]
+
+        self.misses += 1
+        # populations are frozen into a tuple of floats, other values are stored as they are
+        value = tuple(float(v) for v in compute()) if freeze else compute()
+        self._store[key] = value
+        if len(self._store) > self.maxsize:
+            self._store.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._store.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._store)
+
+
+# shared by the decay solvers so repeated runs with the same excitation
+# parameters integrate the excitation phase only once
+excitation_cache = PopulationCache()
+
+# whole excitation runs of the pipeline, curves included, so fewer of them are kept
+excitation_runs = PopulationCache(maxsize=8)
+
+
+def excitation_key(model, rate_constants, time_pulse, num_photon, **options):
+    # every rate of the model enters the excitation-phase matrix, the decay channels stay open during the
+    # pulse, but decay-side settings and the rates an input file lists for other models do not
+    rates = {name: rate_constants[name] for name in model.rate_names}
+    return PopulationCache.make_key(rates, time_pulse, num_photon, model=model.name, **options)
+
+
+def cache_counts():
+    caches = (excitation_cache, excitation_runs)
+    return sum(cache.hits for cache in caches), sum(cache.misses for cache in caches)
+
+
+def populations_from_excitation(excitation, time_pulse):
+    # accepts an excitation solver or a solve_ivp/propagator result with dense output
+    if hasattr(excitation, 'get_solution_at_time'):
+        return tuple(excitation.get_solution_at_time())
+    if getattr(excitation, 'sol', None) is not None:
+        return tuple(excitation.sol(time_pulse))
+    raise TypeError("The excitation result needs a dense output 'sol' or a 'get_solution_at_time' method.")
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from kinetics.fitting import log_bin
+
+INFORMATION_CRITERIA = ('aic', 'bic')
+REFINEMENT_GRIDS = ('uniform', 'log', 'raw')
+WEIGHTINGS = (None, 'poisson', 'relative')
+
+
+class DecayDecomposition:
+    # y(t) = sum_i amplitudes[i] * exp(-t / lifetimes[i]) + offset, fastest component first
+    def __init__(self, lifetimes, amplitudes, offset, order, criterion_value, rss, n_points):
+        self.lifetimes = np.asarray(lifetimes, dtype=np.float64)
+        self.amplitudes = np.asarray(amplitudes, dtype=np.float64)
+        self.offset = offset
+        self.order = order
+        self.criterion_value = criterion_value
+        self.rss = rss
+        self.n_points = n_points
+
+    def evaluate(self, t):
+        t = np.asarray(t, dtype=np.float64)
+        return np.exp(-t[:, None] / self.lifetimes[None, :]) @ self.amplitudes + self.offset
+
+    def __repr__(self):
+        lifetimes = ", ".join(f"{tau:.3e}" for tau in self.lifetimes)
+        return f"DecayDecomposition(order={self.order}, lifetimes=[{lifetimes}], offset={self.offset:.3e})"
+
+
+def resample_uniform(t_data, y_data, n_points=256, window=None):
+    # the pencil needs equally spaced samples; TCSPC histograms already are, simulated decays are not
+    t_data = np.asarray(t_data, dtype=np.float64)
+    y_data = np.asarray(y_data, dtype=np.float64)
+    t_start, t_stop = window if window is not None else (t_data[0], t_data[-1])
+    inside = (t_data >= t_start) & (t_data <= t_stop)
+    t_inside, y_inside = t_data[inside], y_data[inside]
+
+    steps = np.diff(t_inside)
+    if t_inside.size >= 2 * n_points and np.allclose(steps, steps[0], rtol=1e-6):
+        # dense uniform data is averaged in equal blocks instead of decimated, which keeps the
+        # counting noise down and maps every exponential onto an exponential with the same pole
+        factor = t_inside.size // n_points
+        size = (t_inside.size // factor) * factor
+        return (
+            t_inside[:size].reshape(-1, factor).mean(axis=1),
+            y_inside[:size].reshape(-1, factor).mean(axis=1),
+        )
+
+    t_uniform = np.linspace(t_start, t_stop, n_points)
+    return t_uniform, np.interp(t_uniform, t_data, y_data)
+
+
+def decay_weights(y_data, weighting='poisson'):
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"Unknown weighting '{weighting}', choose one of {WEIGHTINGS}.")
+    y_data = np.asarray(y_data, dtype=np.float64)
+    if weighting == 'poisson':
+        # photon counts, at least one count of variance per bin
+        return 1.0 / np.sqrt(np.clip(y_data, 1.0, None))
+    if weighting == 'relative':
+        floor = max(np.max(np.abs(y_data)) * 1e-12, np.finfo(float).tiny)
+        return 1.0 / np.clip(np.abs(y_data), floor, None)
+    return np.ones_like(y_data)
+
+
+def pencil_right_vectors(y_uniform, pencil=None):
+    # right singular vectors of the Hankel data matrix, computed once and reused for every order;
+    # a constant background is left to the linear amplitude solve
+    y = np.ascontiguousarray(y_uniform, dtype=np.float64)
+    n = y.size
+    L = pencil or n // 3
+    hankel = np.lib.stride_tricks.as_strided(y, shape=(n - L, L + 1), strides=(y.strides[0], y.strides[0]))
+    _, singular_values, Vh = np.linalg.svd(hankel, full_matrices=False)
+    return Vh.conj().T, singular_values
+
+
+def pencil_rates(V, order, dt):
+    # signal poles z_i = exp(-dt / tau_i) are the eigenvalues of pinv(V1) @ V2 for the leading vectors
+    Vs = V[:, :order]
+    z = np.linalg.eigvals(np.linalg.pinv(Vs[:-1]) @ Vs[1:])
+    # keep real, decaying poles; complex pairs and growing poles are noise at this order
+    z = z[(np.abs(z.imag) < 1e-6 * np.abs(z)) & (z.real > 0) & (z.real < 1)].real
+    return np.sort(-np.log(z) / dt)[::-1]
+
+
+def _weighted_basis(t_data, weights, rates, offset):
+    exponentials = np.exp(-np.outer(t_data, rates))
+    if offset:
+        exponentials = np.hstack((exponentials, np.ones((t_data.size, 1))))
+    return exponentials * weights[:, None]
+
+
+def _linear_fit(t_data, y_data, weights, rates, offset):
+    basis = _weighted_basis(t_data, weights, rates, offset)
+    coeffs, _, _, _ = np.linalg.lstsq(basis, y_data * weights, rcond=None)
+    return coeffs, basis @ coeffs - y_data * weights
+
+
+def information_criterion(rss, n_points, n_params, criterion='bic'):
+    if criterion not in INFORMATION_CRITERIA:
+        raise ValueError(f"Unknown information criterion '{criterion}', choose one of {INFORMATION_CRITERIA}.")
+    fit_term = n_points * np.log(max(rss, np.finfo(float).tiny) / n_points)
+    penalty = 2 * n_params if criterion == 'aic' else n_params * np.log(n_points)
+    return fit_term + penalty
+
+
+def refine_rates(t_data, y_data, weights, rates, offset):
+    # weighted variable projection: the amplitudes follow from a linear solve for each set of
+    # lifetimes, so only log10(tau) is optimized, with Kaufman's approximate Jacobian
+    # J_j = (I - Q Q^T) dPhi_j c_j instead of finite differences
+    from scipy.optimize import least_squares
+
+    n_rates = rates.size
+    weighted_y = y_data * weights
+    last = {}
+
+    def solve(log10_taus):
+        # least_squares asks for the residual and the Jacobian at the same point
+        key = log10_taus.tobytes()
+        if key not in last:
+            rates = 10.0 ** -log10_taus
+            basis = _weighted_basis(t_data, weights, rates, offset)
+            Q, R = np.linalg.qr(basis)
+            coeffs = np.linalg.lstsq(R, Q.T @ weighted_y, rcond=None)[0]
+            last.clear()
+            last[key] = (rates, basis, Q, coeffs)
+        return last[key]
+
+    def residuals(log10_taus):
+        _, basis, _, coeffs = solve(log10_taus)
+        return basis @ coeffs - weighted_y
+
+    def jacobian(log10_taus):
+        rates, basis, Q, coeffs = solve(log10_taus)
+        # d/dlog10(tau) exp(-t rate) = exp(-t rate) * t * rate * ln(10)
+        dbasis = basis[:, :n_rates] * np.outer(t_data, rates) * np.log(10) * coeffs[:n_rates]
+        return dbasis - Q @ (Q.T @ dbasis)
+
+    x0 = np.log10(1.0 / rates)
+    result = least_squares(residuals, x0=x0, jac=jacobian, bounds=(x0 - 3, x0 + 3), method='trf')
+    return 1.0 / 10.0 ** result.x
+
+
+def decompose_decay(
+    t_data, y_data, max_order=4, offset=True, criterion='bic', n_points=256, window=None, pencil=None,
+    refine=True, grid='uniform', bins=400, weighting='poisson', rank_tol=1e-10
+):
+    if grid not in REFINEMENT_GRIDS:
+        raise ValueError(f"Unknown refinement grid '{grid}', choose one of {REFINEMENT_GRIDS}.")
+
+    t_uniform, y_uniform = resample_uniform(t_data, y_data, n_points=n_points, window=window)
+    dt = t_uniform[1] - t_uniform[0]
+    V, singular_values = pencil_right_vectors(y_uniform, pencil=pencil)
+
+    if grid == 'uniform':
+        t_fit, y_fit = t_uniform, y_uniform
+    elif grid == 'log':
+        t_fit, y_fit = log_bin(t_data, y_data, bins)
+    else:
+        t_fit, y_fit = np.asarray(t_data, dtype=np.float64), np.asarray(y_data, dtype=np.float64)
+    w_fit = decay_weights(y_fit, weighting)
+
+    # every order is seeded from the pencil, refined and scored, the criterion picks the winner;
+    # orders beyond the numerical rank of the data matrix only fit round-off
+    best = None
+    for order in range(1, min(max_order, V.shape[1] - 1) + 1):
+        if singular_values[order - 1] < rank_tol * singular_values[0]:
+            break
+        rates = pencil_rates(V, order, dt)
+        if offset:
+            # a pole far slower than the window is the constant background again
+            rates = rates[rates * (t_uniform[-1] - t_uniform[0]) > 1e-2]
+        if rates.size < order:
+            continue
+        if refine:
+            rates = refine_rates(t_fit, y_fit, w_fit, rates, offset)
+        coeffs, residual = _linear_fit(t_fit, y_fit, w_fit, rates, offset)
+        rss = float(residual @ residual)
+        value = information_criterion(rss, t_fit.size, 2 * order + int(offset), criterion)
+        if best is not None and value >= best[0]:
+            # the criterion has turned, more components only fit noise
+            break
+        best = (value, rates, coeffs, rss)
+    if best is None:
+        raise ValueError("No decaying component found in the data.")
+    criterion_value, rates, coeffs, rss = best
+    if grid == 'uniform':
+        # block averages scale every exponential by a rate-dependent factor, so the amplitudes of the
+        # chosen lifetimes are solved again on the samples themselves
+        t_raw, y_raw = np.asarray(t_data, dtype=np.float64), np.asarray(y_data, dtype=np.float64)
+        if window is not None:
+            inside = (t_raw >= window[0]) & (t_raw <= window[1])
+            t_raw, y_raw = t_raw[inside], y_raw[inside]
+        coeffs, _ = _linear_fit(t_raw, y_raw, decay_weights(y_raw, weighting), rates, offset)
+
+    fastest = np.argsort(rates)[::-1]
+    return DecayDecomposition(
+        1.0 / rates[fastest], coeffs[:rates.size][fastest], float(coeffs[-1]) if offset else 0.0, rates.size,
+        criterion_value, rss, t_fit.size
+    )
+
+
+def _decompose_task(task):
+    t_data, y_data, options = task
+    try:
+        return decompose_decay(t_data, y_data, **options)
+    except (ValueError, np.linalg.LinAlgError):
+        # one unusable curve must not take down the rest of the dataset
+        return None
+
+
+def decompose_decays(t_data, curves, workers=1, chunksize=None, **options):
+    # one decomposition per row of curves (B, T) on the common time axis, None where it failed
+    t_data = np.asarray(t_data, dtype=np.float64)
+    tasks = [(t_data, y_data, options) for y_data in np.atleast_2d(curves)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(tasks) <= 1:
+        return [_decompose_task(task) for task in tasks]
+
+    if chunksize is None:
+        chunksize = max(1, len(tasks) // (workers * 4))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_decompose_task, tasks, chunksize=chunksize))
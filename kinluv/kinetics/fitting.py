@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+import itertools
+import numpy as np
+
+FIT_METHODS = ('varpro', 'legacy')
+
+
+def two_exp(t, A1, log10_tau1, A2, log10_tau2, C):
+    tau1 = 10 ** log10_tau1
+    tau2 = 10 ** log10_tau2
+    return A1 * np.exp(-t / tau1) + A2 * np.exp(-t / tau2) + C
+
+
+def log_bin(t_data, y_data, bins=400):
+    # average the samples inside log-spaced time bins, empty bins are dropped
+    t_data = np.asarray(t_data, dtype=np.float64)
+    y_data = np.asarray(y_data, dtype=np.float64)
+    positive = t_data > 0
+    edges = np.logspace(np.log10(t_data[positive].min()), np.log10(t_data.max()), bins + 1)
+    index = np.clip(np.searchsorted(edges, t_data, side='right') - 1, 0, bins - 1)
+    counts = np.bincount(index, minlength=bins)
+    keep = counts > 0
+    t_binned = np.bincount(index, weights=t_data, minlength=bins)[keep] / counts[keep]
+    y_binned = np.bincount(index, weights=y_data, minlength=bins)[keep] / counts[keep]
+    return t_binned, y_binned
+
+
+def initial_guess(t_data, s1_data, scale, offset_guess=1.0, threshold=1e-7):
+    # long component plus offset fitted on the tail, then the short component on the early residual
+    from scipy.optimize import curve_fit
+
+    def long_exp(t, A2, log10_tau2, C):
+        tau2 = 10 ** log10_tau2
+        return A2 * np.exp(-t / tau2) + C
+
+    def short_exp(t, A1, log10_tau1):
+        tau1 = 10 ** log10_tau1
+        return A1 * np.exp(-t / tau1)
+
+    mask_long = t_data >= threshold
+    mask_short = t_data <= threshold
+
+    p2, _ = curve_fit(
+        long_exp,
+        t_data[mask_long], s1_data[mask_long],
+        p0=[scale, np.log10(1e-6), offset_guess * scale],
+        bounds=(
+            [0, np.log10(1e-12), 0],
+            [scale, np.log10(1), scale]
+        )
+    )
+    A2_0, log10_tau2_0, C_0 = p2
+
+    tail = long_exp(t_data, *p2)
+    residual = s1_data - tail
+    p1, _ = curve_fit(
+        short_exp,
+        t_data[mask_short], residual[mask_short],
+        p0=[scale, np.log10(1e-9)],
+        bounds=(
+            [0, np.log10(1e-12)],
+            [scale, np.log10(1)]
+        )
+    )
+    A1_0, log10_tau1_0 = p1
+
+    return [A1_0, log10_tau1_0, A2_0, log10_tau2_0, C_0]
+
+
+def log_residuals(params, t_data, s1_data):
+    y = np.clip(two_exp(t_data, *params), 1e-12, None)
+    s = np.clip(s1_data, 1e-12, None)
+    return np.log(s) - np.log(y)
+
+
+def _short_first(params):
+    # report the short component as (A1, tau1)
+    A1, log10_tau1, A2, log10_tau2, C = params
+    if log10_tau1 > log10_tau2:
+        return np.array([A2, log10_tau2, A1, log10_tau1, C])
+    return np.array([A1, log10_tau1, A2, log10_tau2, C])
+
+
+def _log_residual_jacobian(params, t_data, s1_data):
+    A1, log10_tau1, A2, log10_tau2, C = params
+    tau1 = 10 ** log10_tau1
+    tau2 = 10 ** log10_tau2
+    e1 = np.exp(-t_data / tau1)
+    e2 = np.exp(-t_data / tau2)
+    y = A1 * e1 + A2 * e2 + C
+    dy = np.column_stack((
+        e1, A1 * e1 * t_data / tau1 * np.log(10), e2, A2 * e2 * t_data / tau2 * np.log(10), np.ones_like(t_data)
+    ))
+    # the clipped part of the model has no gradient
+    active = y > 1e-12
+    jac = np.zeros_like(dy)
+    jac[active] = -dy[active] / y[active, None]
+    return jac
+
+
+def _linear_amplitudes(t_data, s1_data, weights, log10_taus, scale):
+    # for fixed lifetimes the model is linear in (A1, A2, C): bounded weighted least squares
+    from scipy.optimize import nnls
+
+    basis = np.column_stack((
+        np.exp(-t_data / 10 ** log10_taus[0]),
+        np.exp(-t_data / 10 ** log10_taus[1]),
+        np.ones_like(t_data),
+    ))
+    amplitudes, _ = nnls(basis * weights[:, None], s1_data * weights)
+    return np.minimum(amplitudes, scale)
+
+
+def fit_two_exponentials_varpro(
+    t_data, s1_data, scale, x0=None, bins=400, polish=True,
+    log10_tau_bounds=(np.log10(1e-12), np.log10(1)), log10_tau_grid=np.arange(-11.0, -1.0), n_starts=2
+):
+    # variable projection: the amplitudes are solved in closed form for every pair of lifetimes,
+    # so only log10(tau1) and log10(tau2) go to a bounded multi-start local optimizer
+    from scipy.optimize import least_squares
+
+    t_data = np.asarray(t_data, dtype=np.float64)
+    s1_data = np.asarray(s1_data, dtype=np.float64)
+    t_fit, s_fit = log_bin(t_data, s1_data, bins) if bins else (t_data, s1_data)
+
+    # relative weights make the linear subproblem match the logarithmic misfit
+    weights = 1.0 / np.clip(s_fit, 1e-12, None)
+
+    def full_params(log10_taus):
+        A1, A2, C = _linear_amplitudes(t_fit, s_fit, weights, log10_taus, scale)
+        return [A1, log10_taus[0], A2, log10_taus[1], C]
+
+    def residuals(log10_taus):
+        return log_residuals(full_params(log10_taus), t_fit, s_fit)
+
+    # a coarse grid screened by the projected cost picks the starting points, one linear
+    # solve per lifetime pair; the tail/short curve_fit guess is always tried first
+    grid = list(itertools.combinations(np.asarray(log10_tau_grid, dtype=np.float64), 2))
+    costs = [np.sum(residuals(pair) ** 2) for pair in grid]
+    seeds = [grid[idx] for idx in np.argsort(costs)[:n_starts]]
+    if x0 is not None:
+        seeds.insert(0, (x0[1], x0[3]))
+
+    lower, upper = log10_tau_bounds
+    best = None
+    for seed in seeds:
+        seed = np.clip(seed, lower + 1e-9, upper - 1e-9)
+        result = least_squares(
+            residuals,
+            x0=seed,
+            bounds=([lower, lower], [upper, upper]),
+            method='trf',
+            loss='soft_l1',
+            ftol=1e-10,
+            xtol=1e-10,
+            gtol=1e-10
+        )
+        if best is None or result.cost < best.cost:
+            best = result
+
+    params = np.array(full_params(best.x))
+    if not polish:
+        return _short_first(params)
+
+    # same local refinement of all five parameters as the legacy fit
+    lower_bounds = np.array([0, lower, 0, lower, 0])
+    upper_bounds = np.array([scale, upper, scale, upper, scale])
+    result = least_squares(
+        log_residuals,
+        x0=np.clip(params, lower_bounds, upper_bounds),
+        jac=_log_residual_jacobian,
+        args=(t_fit, s_fit),
+        bounds=(lower_bounds, upper_bounds),
+        method='trf',
+        loss='soft_l1',
+        ftol=1e-12,
+        xtol=1e-12,
+        gtol=1e-12
+    )
+    return _short_first(result.x)
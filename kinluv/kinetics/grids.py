@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from kinetics.plotting import Y_FLOOR
+from kinetics.propagator import MatrixExponentialPropagator
+
+# 'fixed' keeps the dense log-spaced grids of the original scripts, 'timescales' concentrates the
+# points around the eigen-timescales of the rate matrix, 'adaptive' refines until straight lines
+# in log time reproduce the curves to grid_tol
+GRIDS = ('fixed', 'timescales', 'adaptive')
+GRID_POINTS = 2000
+GRID_TOL = 1e-3
+# first time point of the excitation and decay grids
+GRID_STARTS = {'excitation': 1e-15, 'decay': 1e-12}
+# points of each log-spaced segment of the fixed grids; the numeric solvers split the decay at
+# DECAY_SPLIT into a fast and a slow segment, the closed-form models use one segment (decay_split=None)
+FIXED_POINTS = 10000
+DECAY_SPLIT = 1e-7
+# a timescale tau shapes the curves between tau * 1e-2 and tau * 1e2
+TIMESCALE_WINDOW = (1e-2, 1e2)
+
+
+def fixed_excitation_grid(time_excitation):
+    return np.logspace(np.log10(GRID_STARTS['excitation']), np.log10(time_excitation), FIXED_POINTS)
+
+
+def fixed_decay_grid(time_decay, decay_split=DECAY_SPLIT):
+    if decay_split is None:
+        return np.logspace(np.log10(GRID_STARTS['decay']), np.log10(time_decay), FIXED_POINTS)
+    t_fast = np.logspace(np.log10(GRID_STARTS['decay']), np.log10(decay_split), FIXED_POINTS)
+    t_low = np.logspace(np.log10(decay_split), np.log10(time_decay), FIXED_POINTS)
+    return np.unique(np.concatenate((t_fast, t_low)))
+
+
+def _from_log(u, t_start, t_stop):
+    # 10 ** log10(t) can land just outside [t_start, t_stop], which solve_ivp rejects in t_eval
+    t = 10 ** u
+    t[0], t[-1] = t_start, t_stop
+    return t
+
+
+def split_grid(t, t_split):
+    # the points up to t_split with t_split itself as the last one, and the points after it
+    t = np.asarray(t, dtype=np.float64)
+    # a grid point within rounding of t_split would duplicate it
+    t = t[~np.isclose(t, t_split, rtol=1e-9, atol=0)]
+    return np.append(t[t < t_split], t_split), t[t > t_split]
+
+
+def rate_timescales(A):
+    # 1 / |eigenvalue| of every decaying mode, the steady state has none
+    A = A.toarray() if hasattr(A, 'toarray') else np.asarray(A, dtype=np.float64)
+    rates = np.abs(np.linalg.eigvals(A).real)
+    rates = rates[rates > rates.max() * 1e-14] if rates.size and rates.max() > 0 else rates[:0]
+    return np.sort(1.0 / rates)
+
+
+def timescale_grid(A, t_start, t_stop, max_points=GRID_POINTS, base_fraction=0.25):
+    # a quarter of the budget spread evenly in log time, the rest shared by the timescale windows
+    u_start, u_stop = np.log10(t_start), np.log10(t_stop)
+    n_base = max(2, int(max_points * base_fraction))
+    low, high = TIMESCALE_WINDOW
+    windows = []
+    for tau in rate_timescales(A):
+        window = (max(u_start, np.log10(tau * low)), min(u_stop, np.log10(tau * high)))
+        if window[1] > window[0]:
+            windows.append(window)
+
+    pieces = [np.linspace(u_start, u_stop, n_base)]
+    if windows:
+        n_window = max(2, (max_points - n_base) // len(windows))
+        pieces.extend(np.linspace(start, stop, n_window) for start, stop in windows)
+    return _from_log(np.unique(np.concatenate(pieces)), t_start, t_stop)
+
+
+def _interval_errors(y_left, y_right, y_mid, floor):
+    # deviation of the midpoint from the straight line between the ends, relative to the population
+    linear = 0.5 * (y_left + y_right)
+    return np.max(np.abs(y_mid - linear) / np.maximum(np.abs(y_mid), floor), axis=0)
+
+
+def adaptive_grid(evaluate, t_start, t_stop, max_points=GRID_POINTS, tol=GRID_TOL, floor=Y_FLOOR, points_per_decade=8):
+    # evaluate(t) returns the (N, T) populations; intervals are halved in log time while their midpoint
+    # is off by more than tol, the worst ones first once the budget runs short
+    u_start, u_stop = np.log10(t_start), np.log10(t_stop)
+    n_initial = min(max_points, max(16, int(np.ceil((u_stop - u_start) * points_per_decade)) + 1))
+    u = np.linspace(u_start, u_stop, n_initial)
+    y = np.asarray(evaluate(10 ** u), dtype=np.float64)
+    active = np.ones(u.size - 1, dtype=bool)
+
+    while active.any() and u.size < max_points:
+        left = np.flatnonzero(active)
+        u_mid = 0.5 * (u[left] + u[left + 1])
+        y_mid = np.asarray(evaluate(10 ** u_mid), dtype=np.float64)
+        errors = _interval_errors(y[:, left], y[:, left + 1], y_mid, floor)
+
+        split = np.flatnonzero(errors > tol)
+        if split.size == 0:
+            break
+        room = max_points - u.size
+        if split.size > room:
+            split = split[np.argsort(errors[split])[::-1][:room]]
+
+        is_new = np.concatenate((np.zeros(u.size, dtype=bool), np.ones(split.size, dtype=bool)))
+        u = np.concatenate((u, u_mid[split]))
+        y = np.concatenate((y, y_mid[:, split]), axis=1)
+        order = np.argsort(u, kind='mergesort')
+        u, y, is_new = u[order], y[:, order], is_new[order]
+        # only the halves of the intervals just split can still be too coarse
+        active = is_new[:-1] | is_new[1:]
+
+    return _from_log(u, t_start, t_stop)
+
+
+def time_grid(phase, t_stop, grid='fixed', A=None, evaluate=None, max_points=None, tol=None, decay_split=DECAY_SPLIT):
+    # evaluation grid of one phase, from GRID_STARTS[phase] to t_stop; A is the rate matrix of the
+    # phase and evaluate(t) its (N, T) populations, needed by 'timescales' and 'adaptive' respectively
+    if grid not in GRIDS:
+        raise ValueError(f"Unknown grid '{grid}', choose one of {GRIDS}.")
+    if phase not in GRID_STARTS:
+        raise ValueError(f"Unknown phase '{phase}', choose one of {tuple(GRID_STARTS)}.")
+    if grid == 'fixed':
+        return fixed_excitation_grid(t_stop) if phase == 'excitation' else fixed_decay_grid(t_stop, decay_split)
+
+    max_points = int(max_points or GRID_POINTS)
+    if grid == 'timescales':
+        if A is None:
+            raise ValueError("The 'timescales' grid needs the rate matrix.")
+        return timescale_grid(A, GRID_STARTS[phase], t_stop, max_points=max_points)
+    if evaluate is None:
+        raise ValueError("The 'adaptive' grid needs a function evaluating the populations.")
+    return adaptive_grid(evaluate, GRID_STARTS[phase], t_stop, max_points=max_points, tol=tol or GRID_TOL)
+
+
+def model_time_grid(
+    model, rate_constants, phase, t_stop, y0=None, grid='fixed', max_points=None, tol=None, evaluate=None,
+    decay_split=DECAY_SPLIT
+):
+    # grid of a KineticModel phase; the adaptive one is refined against evaluate(t), by default the
+    # exact propagator from y0, the closed-form models pass their parametric solution instead
+    if grid == 'fixed':
+        return time_grid(phase, t_stop, decay_split=decay_split)
+    A = model.rate_matrix(rate_constants, excitation=phase == 'excitation')
+    if evaluate is None and grid == 'adaptive':
+        propagator = MatrixExponentialPropagator(A)
+        y0 = np.asarray(y0, dtype=np.float64)
+        evaluate = lambda t: propagator.propagate(y0, t)
+    return time_grid(phase, t_stop, grid, A=A, evaluate=evaluate, max_points=max_points, tol=tol)
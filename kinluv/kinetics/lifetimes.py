@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from scipy.linalg import schur, solve_sylvester
+from colorama import Fore
+
+
+class DecayMode:
+    # one exponential term a * exp(-t / lifetime) of the decay kinetics
+    def __init__(self, rate, amplitudes, emission_amplitude, emission_yield):
+        self.rate = rate
+        self.lifetime = 1.0 / rate if rate > 0 else np.inf
+        self.amplitudes = amplitudes
+        self.emission_amplitude = emission_amplitude
+        self.emission_yield = emission_yield
+        self.emission_fraction = np.nan
+
+    def __repr__(self):
+        return f"DecayMode(lifetime={self.lifetime:.3e}, emission_fraction={self.emission_fraction:.3e})"
+
+
+def _spectral_projector(A, select):
+    # projector onto the invariant subspace of the eigenvalues picked by select, along all others: the
+    # sorted Schur form [[T11, T12], [0, T22]] is block-diagonalized by T11 X - X T22 = -T12
+    T, Q, k = schur(A, output='real', sort=select)
+    n = A.shape[0]
+    P = np.zeros((n, n))
+    P[:k, :k] = np.eye(k)
+    if k < n:
+        P[:k, k:] = -solve_sylvester(T[:k, :k], -T[k:, k:], -T[:k, k:])
+    return Q @ P @ Q.T
+
+
+def _mode_clusters(A, rtol):
+    # eigenvalues equal up to rtol of the fastest rate form one mode, a defective block has no eigenbasis
+    eigenvalues = np.sort(np.linalg.eigvals(A).real)
+    tol = rtol * max(np.abs(eigenvalues).max(), np.finfo(float).tiny)
+    clusters = [[eigenvalues[0]]]
+    for value in eigenvalues[1:]:
+        if value - clusters[-1][-1] <= tol:
+            clusters[-1].append(value)
+        else:
+            clusters.append([value])
+    return [(float(np.mean(cluster)), 0.5 * (cluster[-1] - cluster[0]) + tol) for cluster in clusters]
+
+
+def _modal_amplitudes(A, y0, cond_limit=1e8, rtol=1e-6):
+    # (rate, excited amplitudes, time-integrated excited populations) of every mode, fastest first;
+    # ill-conditioned eigenvectors, e.g. equal S1 and T1 decay rates without RISC, fall back to the
+    # projectors onto each group of equal eigenvalues, where the mode also carries t * exp(-rate t) terms
+    scale = max(np.abs(np.diag(A)).max(), np.finfo(float).tiny)
+    eigenvalues, eigenvectors = np.linalg.eig(A)
+    with np.errstate(all='ignore'):
+        cond = np.linalg.cond(eigenvectors)
+    modes = []
+    if np.isfinite(cond) and cond < cond_limit:
+        coeffs = np.linalg.solve(eigenvectors, y0.astype(eigenvectors.dtype))
+        for i in np.argsort(eigenvalues.real):
+            # rate matrices have real spectra up to round-off
+            amplitudes = (eigenvectors[:, i] * coeffs[i]).real
+            with np.errstate(divide='ignore', invalid='ignore'):
+                modes.append((-eigenvalues[i].real, amplitudes, amplitudes / -eigenvalues[i].real))
+    else:
+        for center, width in _mode_clusters(A, rtol):
+            projector = _spectral_projector(A, lambda re, im, center=center, width=width: abs(re - center) <= width)
+            amplitudes = projector @ y0
+            # any x with A x = -a, projected back onto the invariant subspace, is int_0^inf exp(A t) a dt
+            modes.append((-center, amplitudes, projector @ np.linalg.lstsq(A, -amplitudes, rcond=None)[0]))
+
+    # a state without any outgoing rate keeps its population, that mode never decays
+    return [
+        (rate, amplitudes, integrated) if rate > rtol * scale else (0.0, amplitudes, np.full_like(amplitudes, np.nan))
+        for rate, amplitudes, integrated in modes
+    ]
+
+
+def decay_modes(model, rate_constants, y0, processes=('FL',)):
+    # P(t) = P(inf) + sum_i a_i exp(lam_i t) from the eigenpairs of the excited block of the
+    # decay matrix; the ground state collects minus the sum of each mode's excited amplitudes
+    ground = model.index(model.ground_state)
+    excited = np.array([idx for idx in range(model.n_states) if idx != ground], dtype=np.intp)
+    A = model.rate_matrix(rate_constants, excitation=False)[np.ix_(excited, excited)]
+    y0 = np.asarray(y0, dtype=np.float64)
+
+    weights = np.zeros(model.n_states)
+    for transition in model.transitions:
+        if transition.process in processes:
+            weights[model.index(transition.source)] += rate_constants[transition.rate_name]
+
+    modes = []
+    for rate, excited_amplitudes, integrated in _modal_amplitudes(A, y0[excited]):
+        amplitudes = np.zeros(model.n_states)
+        amplitudes[excited] = excited_amplitudes
+        amplitudes[ground] = -excited_amplitudes.sum()
+        emission_amplitude = float(weights @ amplitudes)
+        modes.append(DecayMode(rate, dict(zip(model.states, amplitudes)), emission_amplitude, float(weights[excited] @ integrated)))
+
+    # a mode that never decays has no share of the emission
+    total = sum(mode.emission_yield for mode in modes if mode.rate > 0)
+    for mode in modes:
+        mode.emission_fraction = mode.emission_yield / total if total and mode.rate > 0 else np.nan
+    return modes
+
+
+def emission_lifetimes(model, rate_constants, y0, amplitude_tol=1e-6, processes=('FL',)):
+    # lifetimes of the modes that visibly contribute to the emission, fastest first; rise components,
+    # e.g. the S2 -> S1 feeding of the five-state model, enter with a negative amplitude and are skipped
+    modes = decay_modes(model, rate_constants, y0, processes=processes)
+    largest = max((mode.emission_amplitude for mode in modes), default=0.0)
+    return np.array([
+        mode.lifetime for mode in modes
+        if largest > 0 and mode.emission_amplitude > amplitude_tol * largest
+    ])
+
+
+def print_decay_modes(model, modes):
+    print(Fore.CYAN + "\n" + "—" * 40)
+    print(Fore.CYAN + "\n Decay modes of the rate matrix:")
+    print(Fore.CYAN + "\n" + "—" * 40)
+    print(Fore.CYAN + f"\n y = sum_i a_i * exp(-t/tau_i) for every state, {model.emissive_state} shown")
+    print(Fore.YELLOW + "\n >>> Lifetimes and amplitudes are:\n")
+
+    print(f"{'mode':<6}{'tau (s)':<14}{model.emissive_state + ' amplitude':<16}{'emission (%)':<14}")
+    for idx, mode in enumerate(modes, start=1):
+        print(f"{idx:<6}{mode.lifetime:<14.3e}{mode.amplitudes[model.emissive_state]:<16.3e}{mode.emission_fraction * 100:<14.2f}")
+    print("")
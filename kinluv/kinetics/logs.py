@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import sys
+import json
+import logging
+from contextlib import contextmanager
+from colorama import AnsiToWin32
+
+LOG_LEVELS = {'debug': logging.DEBUG, 'info': logging.INFO, 'warning': logging.WARNING, 'error': logging.ERROR}
+# 'text' is the plain log file of the console output, 'jsonl' one JSON record per line
+LOG_FORMATS = ('text', 'jsonl')
+LOG_FILES = {'text': 'log', 'jsonl': 'log.jsonl'}
+ANSI_ESCAPE = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')
+
+
+def strip_ansi(text):
+    return ANSI_ESCAPE.sub('', text)
+
+
+class PlainFormatter(logging.Formatter):
+    # colour codes are only meant for the terminal, they are removed once per record
+    def format(self, record):
+        return strip_ansi(super().format(record))
+
+
+class JsonLinesFormatter(logging.Formatter):
+    # structured fields passed as extra={'data': {...}} end up next to the message
+    def format(self, record):
+        entry = {
+            'time': record.created,
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'message': strip_ansi(record.getMessage()),
+        }
+        data = getattr(record, 'data', None)
+        if data is not None:
+            entry['data'] = data
+        return json.dumps(entry, ensure_ascii=False, default=_json_default)
+
+
+def _json_default(value):
+    # numpy scalars and arrays
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+class BufferedStreamHandler(logging.StreamHandler):
+    # StreamHandler flushes after every record; here the stream's own buffer decides when to write,
+    # and only warnings and errors are pushed out immediately
+    flush_level = logging.WARNING
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= self.flush_level:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+
+class BufferedFileHandler(BufferedStreamHandler):
+    def __init__(self, path, buffer_size=2 ** 20):
+        super().__init__(open(path, 'w', encoding='utf-8', buffering=buffer_size))
+        self.path = path
+
+    def close(self):
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+        finally:
+            self.release()
+        super().close()
+
+
+class LoggerStream:
+    # stand-in for sys.stdout during a run: every print() becomes one log record, so printed
+    # results reach the console and the log file through the same buffered handlers
+    encoding = 'utf-8'
+
+    def __init__(self, logger, level=logging.INFO):
+        self.logger = logger
+        self.level = level
+        self._pending = []
+
+    def write(self, text):
+        # print() writes its arguments and its end separately, the record is complete at the newline
+        self._pending.append(text)
+        if text.endswith('\n'):
+            self.logger.log(self.level, ''.join(self._pending)[:-1])
+            self._pending = []
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self._pending:
+            self.logger.log(self.level, ''.join(self._pending))
+            self._pending = []
+
+    def isatty(self):
+        return False
+
+
+@contextmanager
+def run_logging(results_folder, log_level='info', log_format='text', quiet=False, buffer_size=2 ** 20):
+    # console and log file handlers for the duration of one run; quiet keeps the console to
+    # warnings and errors, the log file still gets everything at log_level
+    if log_level not in LOG_LEVELS:
+        raise ValueError(f"Unknown log level '{log_level}', choose one of {tuple(LOG_LEVELS)}.")
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format '{log_format}', choose one of {LOG_FORMATS}.")
+
+    os.makedirs(results_folder, exist_ok=True)
+    log_path = os.path.join(results_folder, LOG_FILES[log_format])
+    level = LOG_LEVELS[log_level]
+
+    logger = logging.getLogger()
+    stdout = sys.stdout
+    handlers = list(logger.handlers)
+    previous_level = logger.level
+
+    # colorama resets the colour after every record written to the terminal
+    console_handler = BufferedStreamHandler(AnsiToWin32(stdout, autoreset=True).stream)
+    console_handler.setLevel(max(level, logging.WARNING) if quiet else level)
+    console_handler.setFormatter(logging.Formatter('%(message)s'))
+    file_handler = BufferedFileHandler(log_path, buffer_size=buffer_size)
+    file_handler.setLevel(level)
+    file_handler.setFormatter(JsonLinesFormatter() if log_format == 'jsonl' else PlainFormatter('%(message)s'))
+
+    logger.handlers[:] = [file_handler, console_handler]
+    logger.setLevel(level)
+    sys.stdout = LoggerStream(logging.getLogger('kinluv.stdout'))
+    try:
+        yield log_path
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+        logger.handlers[:] = handlers
+        logger.setLevel(previous_level)
+        file_handler.close()
+        console_handler.flush()
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+import re
+import numpy as np
+from scipy import sparse
+
+# models at least this large hold their rate matrix in scipy.sparse form by default
+SPARSE_THRESHOLD = 64
+
+# e.g. "ISC: S1->T1" or "ISC: S1->T1 [k_custom]"
+TRANSITION_PATTERN = re.compile(r'^\s*(\w+)\s*:\s*(\w+)\s*->\s*(\w+)\s*(?:\[\s*(\w+)\s*\])?\s*$')
+
+# absorption only acts during the excitation phase
+EXCITATION_PROCESSES = ('ABS',)
+RADIATIVE_PROCESSES = ('FL', 'PH')
+
+
+class Transition:
+    def __init__(self, process, source, target, rate_name=None):
+        self.process = process.upper()
+        self.source = source
+        self.target = target
+        # k_<process><source><target>, e.g. ISC: S1->T1 reads its rate from k_iscs1t1
+        self.rate_name = rate_name or f"k_{process.lower()}{source.lower()}{target.lower()}"
+
+    @classmethod
+    def parse(cls, spec):
+        match = TRANSITION_PATTERN.match(spec)
+        if match is None:
+            raise ValueError(f"Invalid transition '{spec}', expected e.g. 'ISC: S1->T1'.")
+        process, source, target, rate_name = match.groups()
+        return cls(process, source, target, rate_name)
+
+    @property
+    def is_excitation(self):
+        return self.process in EXCITATION_PROCESSES
+
+    @property
+    def is_radiative(self):
+        return self.process in RADIATIVE_PROCESSES
+
+    def __repr__(self):
+        return f"Transition('{self.process}: {self.source}->{self.target}', rate='{self.rate_name}')"
+
+
+class KineticModel:
+    def __init__(self, name, states, transitions, ground_state=None, emissive_state='S1'):
+        self.name = name
+        self.states = tuple(states)
+        self.ground_state = ground_state or self.states[0]
+        self.emissive_state = emissive_state
+        self.transitions = tuple(t if isinstance(t, Transition) else Transition.parse(t) for t in transitions)
+
+        self._index = {state: idx for idx, state in enumerate(self.states)}
+        for transition in self.transitions:
+            for state in (transition.source, transition.target):
+                if state not in self._index:
+                    raise ValueError(f"Transition {transition} uses the undeclared state '{state}'.")
+            if transition.source == transition.target:
+                raise ValueError(f"Transition {transition} starts and ends in the same state.")
+
+        # index arrays used to scatter the rate constants into the rate matrix
+        self._sources = np.array([self._index[t.source] for t in self.transitions], dtype=np.intp)
+        self._targets = np.array([self._index[t.target] for t in self.transitions], dtype=np.intp)
+        self._excitation_mask = np.array([t.is_excitation for t in self.transitions], dtype=bool)
+
+    @property
+    def n_states(self):
+        return len(self.states)
+
+    @property
+    def rate_names(self):
+        names = []
+        for transition in self.transitions:
+            if transition.rate_name not in names:
+                names.append(transition.rate_name)
+        return names
+
+    def index(self, state):
+        return self._index[state]
+
+    def transitions_for(self, process=None, source=None, target=None):
+        return [
+            t for t in self.transitions
+            if (process is None or t.process == process.upper())
+            and (source is None or t.source == source)
+            and (target is None or t.target == target)
+        ]
+
+    def rate_vector(self, rate_constants, excitation=True):
+        missing = [name for name in self.rate_names if name not in rate_constants]
+        if missing:
+            raise KeyError(f"Missing rate constants for the {self.name} model: {', '.join(missing)}")
+        rates = np.array([rate_constants[t.rate_name] for t in self.transitions], dtype=np.float64)
+        if not excitation:
+            rates[self._excitation_mask] = 0.0
+        return rates
+
+    def rate_matrix(self, rate_constants, excitation=True):
+        # A[target, source] gains k and A[source, source] loses k, so dP/dt = A @ P
+        rates = self.rate_vector(rate_constants, excitation=excitation)
+        A = np.zeros((self.n_states, self.n_states))
+        np.add.at(A, (self._targets, self._sources), rates)
+        np.add.at(A, (self._sources, self._sources), -rates)
+        return A
+
+    def rate_array(self, rate_constants, excitation=True):
+        # (B, M) per-transition rates from a list of rate dicts or from a dict of per-rate arrays of length B
+        if isinstance(rate_constants, dict):
+            missing = [name for name in self.rate_names if name not in rate_constants]
+            if missing:
+                raise KeyError(f"Missing rate constants for the {self.name} model: {', '.join(missing)}")
+            rates = np.stack([np.atleast_1d(np.asarray(rate_constants[t.rate_name], dtype=np.float64))
+                              for t in self.transitions], axis=-1)
+        else:
+            rates = np.stack([self.rate_vector(values) for values in rate_constants])
+        if not excitation:
+            rates[:, self._excitation_mask] = 0.0
+        return rates
+
+    def rate_matrices(self, rate_constants, excitation=True):
+        # (B, N, N) stack, see rate_array for the accepted inputs
+        return self.assemble(self.rate_array(rate_constants, excitation=excitation))
+
+    def assemble(self, rates):
+        # (B, N, N) rate matrices from (B, M) per-transition rates
+        rates = np.atleast_2d(rates)
+        A = np.zeros((rates.shape[0], self.n_states, self.n_states))
+        np.add.at(A, (slice(None), self._targets, self._sources), rates)
+        np.add.at(A, (slice(None), self._sources, self._sources), -rates)
+        return A
+
+    def sparse_rate_matrix(self, rate_constants, excitation=True):
+        # same scatter as rate_matrix, but storage grows with the number of transitions instead of N**2
+        rates = self.rate_vector(rate_constants, excitation=excitation)
+        rows = np.concatenate((self._targets, self._sources))
+        cols = np.concatenate((self._sources, self._sources))
+        A = sparse.coo_matrix((np.concatenate((rates, -rates)), (rows, cols)), shape=(self.n_states, self.n_states)).tocsr()
+        A.eliminate_zeros()
+        return A
+
+    def use_sparse(self, sparse=None):
+        if sparse is None:
+            return self.n_states >= SPARSE_THRESHOLD
+        return bool(sparse)
+
+    def symbolic_rate_matrix(self, excitation=True):
+        import sympy as sp
+
+        A = sp.zeros(self.n_states, self.n_states)
+        for transition in self.transitions:
+            if transition.is_excitation and not excitation:
+                continue
+            k = sp.Symbol(transition.rate_name, positive=True)
+            A[self._index[transition.target], self._index[transition.source]] += k
+            A[self._index[transition.source], self._index[transition.source]] -= k
+        return A
+
+    def initial_populations(self, num_photon):
+        y0 = np.zeros(self.n_states)
+        y0[self._index[self.ground_state]] = num_photon
+        return y0
+
+    def __repr__(self):
+        return f"KineticModel('{self.name}', n_states={self.n_states}, transitions={len(self.transitions)})"
+
+
+TWO_STATE_MODEL = KineticModel('2-states', ['S0', 'S1'], [
+    'ABS: S0->S1',
+    'FL: S1->S0',
+    'IC: S1->S0',
+])
+
+THREE_STATE_MODEL = KineticModel('3-states', ['S0', 'S1', 'T1'], [
+    'ABS: S0->S1',
+    'FL: S1->S0',
+    'IC: S1->S0',
+    'ISC: S1->T1',
+    'RISC: T1->S1',
+    'ISC: T1->S0',
+    'PH: T1->S0',
+])
+
+FOUR_STATE_MODEL = KineticModel('4-states', ['S0', 'S1', 'T1', 'T2'], [
+    'ABS: S0->S1',
+    'FL: S1->S0',
+    'IC: S1->S0',
+    'ISC: S1->T1',
+    'ISC: S1->T2',
+    'RISC: T1->S1',
+    'RISC: T2->S1',
+    'ISC: T1->S0',
+    'PH: T1->S0',
+    'ISC: T2->S0',
+    'PH: T2->S0',
+    'IC: T2->T1',
+    'RIC: T1->T2',
+])
+
+FIVE_STATE_MODEL = KineticModel('5-states', ['S0', 'S1', 'S2', 'T1', 'T2'], [
+    'ABS: S0->S2',
+    'FL: S1->S0',
+    'IC: S1->S0',
+    'FL: S2->S0',
+    'IC: S2->S0',
+    'IC: S2->S1',
+    'RIC: S1->S2',
+    'ISC: S1->T1',
+    'ISC: S1->T2',
+    'ISC: S2->T1',
+    'ISC: S2->T2',
+    'RISC: T1->S1',
+    'RISC: T1->S2',
+    'RISC: T2->S1',
+    'RISC: T2->S2',
+    'ISC: T1->S0',
+    'PH: T1->S0',
+    'ISC: T2->S0',
+    'PH: T2->S0',
+    'IC: T2->T1',
+    'RIC: T1->T2',
+])
+
+MODELS = {
+    2: TWO_STATE_MODEL,
+    3: THREE_STATE_MODEL,
+    4: FOUR_STATE_MODEL,
+    5: FIVE_STATE_MODEL,
+}
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+
+import os
+import logging
+import numpy as np
+from colorama import Fore
+from kinetics.solvers import ERROR_SAMPLES, ExcitationSolver, DecaySolver
+from kinetics.yields import QuantumYieldCalculator
+from kinetics.grids import GRIDS, model_time_grid, split_grid
+from kinetics.lifetimes import decay_modes, print_decay_modes
+from kinetics.plotting import FIGURE_FORMATS, plot_kinetics
+from kinetics.profiling import RunProfiler
+from kinetics.cache import excitation_runs
+from kinetics.results import KineticsResult
+from kinetics.storage import DATA_FORMATS, kinetics_data_path
+
+logger = logging.getLogger()
+
+# None reports the exact eigenmodes only, the fits additionally fit the sampled emission decay:
+# 'varpro' projects out the amplitudes, 'legacy' runs the original differential evolution
+DECAY_FITS = (None, 'varpro', 'legacy')
+# the fits weight every sample alike, on the uneven grids they get this many log-spaced samples instead
+FIT_POINTS = 2000
+# 'window' integrates with the absorption on over the whole excitation window, 'pulse' only up to the
+# end of the pulse, which is all the decay needs; 'pulse+tail' adds the rest of the window, propagated
+# exactly from the pulse-end populations
+EXCITATION_MODES = ('window', 'pulse', 'pulse+tail')
+
+
+def print_main_title(title: str, color_outer=Fore.RED, color_inner=Fore.RED):
+    width = 80
+    pad = 4
+    inner_width = width - pad * 2
+
+    top_border = color_outer + "┌" + "─" * (width - 2) + "┐"
+    bottom_border = color_outer + "└" + "─" * (width - 2) + "┘"
+    empty_line = color_outer + "│" + " " * (width - 2) + "│"
+    title_line = color_inner + "│" + " " * pad + title.center(inner_width) + " " * pad + "│"
+
+    logger.info("\n" + top_border)
+    logger.info(empty_line)
+    logger.info(empty_line)
+    logger.info(title_line)
+    logger.info(empty_line)
+    logger.info(empty_line)
+    logger.info(bottom_border + "\n")
+
+
+def print_section_title(title: str, color=Fore.GREEN):
+    width = 80
+    line = color + "─" * width
+    empty_line = color + "│" + " " * (width - 2) + "│"
+    title_line = color + title.center(width)
+
+    logger.info("\n" + line)
+    logger.info(empty_line)
+    logger.info(title_line)
+    logger.info(empty_line)
+    logger.info(line + "\n")
+
+
+def print_error_estimate(phase, solver):
+    estimate = solver.error_estimate
+    if estimate is None:
+        return
+    logger.info(
+        Fore.CYAN + f"\n Estimated {phase} error against the matrix exponential ({estimate['samples']} sampled points):"
+    )
+    logger.info(
+        f"  max |error| = {estimate['max_abs_error']:.3e}, error / tolerance = {estimate['tolerance_ratio']:.2f} "
+        f"(rtol = {solver.rtol:.0e}, atol = {solver.atol:.0e}, max_step = {solver.max_step:.0e})\n",
+        extra={'data': dict(estimate, phase=phase, tolerance=solver.tolerance)}
+    )
+
+
+def run_kinetics(
+    model, rate_constants, time_pulse, num_photon, time_excitation, time_decay, results_folder,
+    engine='radau', sparse=None, decay_fit=None, title=None, excitation_solver_class=ExcitationSolver, decay_solver_class=DecaySolver,
+    yield_calculator_class=QuantumYieldCalculator, data_format='text', data_stride=None, data_log_points=None,
+    plot=True, plot_format='pdf', quiet=False, profiler=None, tolerance='default', rtol=None, atol=None,
+    excitation_max_step=None, decay_max_step=None, grid='fixed', grid_points=None, grid_tol=None, excitation_mode='window', error_estimate=False
+):
+    if decay_fit not in DECAY_FITS:
+        raise ValueError(f"Unknown decay fit '{decay_fit}', choose one of {DECAY_FITS}.")
+    if data_format not in DATA_FORMATS:
+        raise ValueError(f"Unknown data format '{data_format}', choose one of {DATA_FORMATS}.")
+    if plot_format not in FIGURE_FORMATS:
+        raise ValueError(f"Unknown plot format '{plot_format}', choose one of {FIGURE_FORMATS}.")
+    if grid not in GRIDS:
+        raise ValueError(f"Unknown grid '{grid}', choose one of {GRIDS}.")
+    if excitation_mode not in EXCITATION_MODES:
+        raise ValueError(f"Unknown excitation mode '{excitation_mode}', choose one of {EXCITATION_MODES}.")
+
+    os.makedirs(results_folder, exist_ok=True)
+    # without a profiler from profile_run only the stage timers and solver counters are recorded
+    if profiler is None:
+        profiler = RunProfiler()
+        profiler.enable()
+
+    print_main_title(f"o WELCOME TO {title or model.name.upper()} KINETICS CALCULATIONS o")
+
+    logger.info(Fore.RED + f"\n >>> Running {model.name} module with the following parameters: \n")
+    for key, value in rate_constants.items():
+        logger.info(Fore.WHITE + f"{key}: {value:.2e}")
+    logger.info(Fore.WHITE + f"tolerance: {tolerance}")
+    logger.info(Fore.WHITE + f"grid: {grid}")
+    logger.info(Fore.WHITE + f"excitation: {excitation_mode}")
+    if error_estimate and engine == 'expm':
+        logger.info(Fore.WHITE + "error estimate: skipped, the expm engine is exact")
+
+    # the check against the matrix exponential is opt-in, it costs about as much as the expm engine
+    tolerances = {'tolerance': tolerance, 'rtol': rtol, 'atol': atol, 'error_samples': ERROR_SAMPLES if error_estimate else 0}
+
+    # step 1: run excitation solver
+    print_section_title("→ Step 1: Running the excitation solver")
+    logger.info(Fore.CYAN + "\n >>> Solving the excitation kinetics...\n")
+
+    profiler.start('excitation')
+    excitation_solver = excitation_solver_class(
+        time_pulse, num_photon, model=model, max_step=excitation_max_step, **tolerances, **rate_constants
+    )
+
+    # define time span and initial conditions for excitation
+    t_stop_excitation = time_pulse if excitation_mode == 'pulse' else time_excitation
+    t_eval_excitation = model_time_grid(
+        model, rate_constants, 'excitation', t_stop_excitation, y0=model.initial_populations(num_photon), grid=grid,
+        max_points=grid_points, tol=grid_tol
+    )
+    t_eval_tail = None
+    if excitation_mode == 'window':
+        t_span_excitation = (0, time_excitation)
+    else:
+        t_span_excitation = (0, time_pulse)
+        t_eval_excitation, t_eval_tail = split_grid(t_eval_excitation, time_pulse)
+
+    def solve_excitation():
+        solution = excitation_solver.solve_numerically(
+            t_span=t_span_excitation, t_eval=t_eval_excitation, engine=engine, sparse=sparse
+        )
+        t, y = solution.t, solution.y
+        if excitation_mode == 'pulse+tail':
+            t = np.concatenate((t, t_eval_tail))
+            y = np.hstack((y, excitation_solver.propagate_after_pulse(t_eval_tail)))
+        # the cached curves are shared by every run that hits them
+        t.setflags(write=False)
+        y.setflags(write=False)
+        return solution, t, y, excitation_solver.error_estimate
+
+    # runs that differ only in decay-side settings share the whole excitation phase
+    run_key = excitation_solver.cache_key(
+        engine, t_span_excitation, sparse=sparse, excitation_mode=excitation_mode, time_excitation=float(time_excitation),
+        grid=grid, grid_points=grid_points, grid_tol=grid_tol
+    )
+    solution_excitation, t_excitation, y_excitation, error_estimate = excitation_runs.get_or_compute(
+        run_key, solve_excitation, freeze=False
+    )
+    excitation_solver.solutions, excitation_solver.error_estimate = solution_excitation, error_estimate
+    profiler.stop('excitation')
+    profiler.record_solver('excitation', solution_excitation)
+    # quiet runs skip the population dumps, the data file holds the full curves anyway
+    if not quiet:
+        excitation_solver.display_results()
+    print_error_estimate('excitation', excitation_solver)
+    populations_at_time = excitation_solver.get_solution_at_time()
+    logger.info(Fore.CYAN + f"\n Population after pulse duration {excitation_solver.time_pulse:.2e} s:")
+    for idx, (state, value) in enumerate(zip(model.states, populations_at_time)):
+        end = "\n" if idx == model.n_states - 1 else ""
+        logger.info(Fore.CYAN + f"  {state} = {value:.3e}{end}", extra={'data': {'state': state, 'population': value}})
+
+    # step 2: run decay solver
+    print_section_title("→ Step 2: Running the decay solver")
+    logger.info(Fore.CYAN + "\n >>> Solving the decay kinetics...\n")
+
+    profiler.start('decay')
+    decay_solver = decay_solver_class(time_pulse, num_photon, model=model, max_step=decay_max_step, **tolerances, **rate_constants)
+
+    # define time span and initial conditions for decay
+    t_span_decay = (0, time_decay)
+    # the adaptive decay grid follows the populations left at the end of the pulse
+    t_eval_decay = model_time_grid(
+        model, rate_constants, 'decay', time_decay, y0=populations_at_time, grid=grid, max_points=grid_points, tol=grid_tol
+    )
+
+    solution_decay = decay_solver.solve_numerically(
+        t_span=t_span_decay,
+        t_eval=t_eval_decay,
+        rate_constants=rate_constants,
+        engine=engine,
+        y0=populations_at_time,
+        sparse=sparse
+    )
+    profiler.stop('decay')
+    profiler.record_solver('decay', solution_decay)
+    if not quiet:
+        decay_solver.display_results()
+    print_error_estimate('decay', decay_solver)
+
+    # lifetimes and amplitudes follow exactly from the eigenmodes of the decay matrix
+    modes = decay_modes(model, rate_constants, populations_at_time)
+    print_decay_modes(model, modes)
+
+    # optional fit of the emission decay using exponentials
+    fitted_params = None
+    if decay_fit is not None:
+        profiler.start('fit')
+        fit_file = os.path.join(results_folder, f"decay_fit.{plot_format}") if plot else None
+        emissive = model.index(model.emissive_state)
+        t_fit, s1_fit = solution_decay.t, solution_decay.y[emissive]
+        if grid != 'fixed':
+            t_fit = np.logspace(np.log10(t_eval_decay[0]), np.log10(t_eval_decay[-1]), FIT_POINTS)
+            s1_fit = solution_decay.sol(t_fit)[emissive]
+        fitted_params = decay_solver.fit_s1_with_two_exponentials(t_fit, s1_fit, fit_path=fit_file, method=decay_fit)
+        profiler.stop('fit')
+
+    # step 3: run PLQY calculations
+    print_section_title("→ Step 3: Running the quantum yield calculation")
+    logger.info(Fore.CYAN + "\n >>> Calculating the quantum yield...")
+
+    profiler.start('yields')
+    qyd_calculator = yield_calculator_class(rate_constants, model=model, sparse=sparse)
+    qyd_calculator.calculate_quantum_yield()
+    profiler.stop('yields')
+
+    # step 4: plotting kinetic figures
+    print_section_title("→ Step 4: Plotting kinetics")
+    logger.info(Fore.CYAN + "\n >>> Generating plots for excitation and decay kinetics...\n")
+
+    profiler.start('output')
+    plot_file = os.path.join(results_folder, f"kinetics_plot.{plot_format}")
+    data_file = kinetics_data_path(results_folder, data_format)
+
+    plot_kinetics(
+        model.states, t_excitation, y_excitation, solution_decay.t, solution_decay.y,
+        fig_path=plot_file, data_path=data_file, data_format=data_format, data_stride=data_stride,
+        data_log_points=data_log_points, plot=plot
+    )
+    profiler.stop('output')
+
+    profile = profiler.finish(results_folder)
+    print_main_title("o CALCULATIONS COMPLETE o")
+    return KineticsResult(
+        model, rate_constants,
+        pulse_end=dict(zip(model.states, populations_at_time)),
+        quantum_yields=qyd_calculator.quantum_yields,
+        process_yields=qyd_calculator.process_yields,
+        decay_modes=modes,
+        decay_fit=fitted_params,
+        error_estimates={
+            phase: solver.error_estimate for phase, solver in (('excitation', excitation_solver), ('decay', decay_solver))
+            if solver.error_estimate is not None
+        },
+        timings=profiler.wall_times(),
+        profile=profile,
+        results_folder=results_folder,
+        arrays={
+            't_excitation': t_excitation, 'y_excitation': y_excitation,
+            't_decay': solution_decay.t, 'y_decay': solution_decay.y,
+        },
+    )
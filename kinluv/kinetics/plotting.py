@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+import os
+import numpy as np
+from kinetics.storage import save_kinetics_data
+
+FIGURE_FORMATS = ('pdf', 'png', 'svg')
+# points kept per curve; a 14x6 inch panel cannot show more detail than this at 300 dpi
+PLOT_MAX_POINTS = 2000
+Y_FLOOR = 1e-10
+
+
+def lttb_indices(x, y, n_out):
+    # largest-triangle-three-buckets: from every bucket keep the point spanning the largest triangle
+    # with its neighbours; the previous bucket enters through its mean instead of its chosen point,
+    # which lets all buckets be scored at once
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = x.size
+    if n_out is None or n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    n_buckets = n_out - 2
+    size = -(-(n - 2) // n_buckets)
+    padded = n_buckets * size
+    index = np.arange(1, 1 + padded)
+    valid = index < n - 1
+    index = np.minimum(index, n - 2).reshape(n_buckets, size)
+    valid = valid.reshape(n_buckets, size)
+
+    bx, by = x[index], y[index]
+    counts = valid.sum(axis=1)
+    mean_x = np.where(valid, bx, 0.0).sum(axis=1) / np.maximum(counts, 1)
+    mean_y = np.where(valid, by, 0.0).sum(axis=1) / np.maximum(counts, 1)
+    prev_x = np.concatenate(([x[0]], mean_x[:-1]))
+    prev_y = np.concatenate(([y[0]], mean_y[:-1]))
+    next_x = np.concatenate((mean_x[1:], [x[-1]]))
+    next_y = np.concatenate((mean_y[1:], [y[-1]]))
+
+    area = np.abs(
+        (prev_x[:, None] - next_x[:, None]) * (by - prev_y[:, None])
+        - (prev_x[:, None] - bx) * (next_y[:, None] - prev_y[:, None])
+    )
+    area[~valid] = -1.0
+    chosen = index[np.arange(n_buckets), np.argmax(area, axis=1)]
+    return np.unique(np.concatenate(([0], chosen[counts > 0], [n - 1])))
+
+
+def downsample_curve(t_values, y_values, max_points, xscale='linear'):
+    # LTTB in display coordinates, i.e. on log10 of the population and of the time when the
+    # time axis is logarithmic
+    if max_points is None or len(t_values) <= max_points:
+        return t_values, y_values
+    t_values = np.asarray(t_values, dtype=np.float64)
+    y_values = np.asarray(y_values, dtype=np.float64)
+    x = np.log10(np.clip(t_values, np.finfo(np.float64).tiny, None)) if xscale == 'log' else t_values
+    keep = lttb_indices(x, np.log10(np.clip(y_values, Y_FLOOR, None)), max_points)
+    return t_values[keep], y_values[keep]
+
+
+def _plot_phase(ax, t_values, y_values, state_names, phase, colors, label_format, legend_fontsize, max_points, xscale):
+    for idx, state in enumerate(state_names):
+        style = {'linewidth': 2}
+        if colors:
+            style['color'] = colors[idx]
+        t_plot, y_plot = downsample_curve(t_values, y_values[idx], max_points, xscale)
+        ax.plot(t_plot, y_plot, label=label_format.format(state=state, phase=phase), **style)
+
+    ax.set_title(f'{phase} Kinetics', fontsize=16, fontweight='bold', color='red')
+    ax.set_xlabel('Time (s)', fontsize=14)
+    ax.set_ylabel('Counts (au)', fontsize=14)
+    ax.set_xscale(xscale)
+    ax.set_yscale('log')
+    ax.grid(True, linestyle='--', alpha=0.7)
+    ax.legend(fontsize=legend_fontsize, loc='upper right', framealpha=0.8)
+    ax.set_facecolor('lightgrey')
+
+    x_min, x_max = np.min(t_values), np.max(t_values)
+    y_max = max(np.max(y_values), 1.1)
+    if xscale == 'linear':
+        ax.set_xlim(x_min - 0.05 * (x_max - x_min), x_max + 0.05 * (x_max - x_min))
+    ax.set_ylim(Y_FLOOR, float(y_max * 1.05))
+
+
+def figure_format(fig_path, fig_format=None):
+    if fig_format is None:
+        fig_format = os.path.splitext(fig_path)[1].lstrip('.').lower() or 'pdf'
+    if fig_format not in FIGURE_FORMATS:
+        raise ValueError(f"Unknown figure format '{fig_format}', choose one of {FIGURE_FORMATS}.")
+    return fig_format
+
+
+def save_figure(fig, fig_path, fig_format=None, dpi=300):
+    # figures are drawn on their own Agg canvas, never through pyplot's global state, so several
+    # runs can plot at once in one process
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    FigureCanvasAgg(fig)
+    fig.savefig(fig_path, dpi=dpi, format=figure_format(fig_path, fig_format), bbox_inches='tight')
+
+
+def plot_kinetics(
+    state_names, t_excitation, y_excitation, t_decay, y_decay, fig_path=None, data_path=None,
+    colors=None, label_format='{state}({phase})', legend_fontsize=12, divider_width=80, data_format='text',
+    data_stride=None, data_log_points=None, plot=True, fig_format=None, max_points=PLOT_MAX_POINTS, xscale='linear',
+    dpi=300
+):
+    y_excitation = np.asarray(y_excitation, dtype=np.float64)
+    y_decay = np.asarray(y_decay, dtype=np.float64)
+
+    if data_path:
+        save_kinetics_data(
+            data_path, state_names, t_excitation, y_excitation, t_decay, y_decay, data_format=data_format,
+            divider_width=divider_width, stride=data_stride, log_points=data_log_points
+        )
+
+    if not plot:
+        return None
+
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(14, 6), facecolor='whitesmoke')
+    ax_excitation, ax_decay = fig.subplots(1, 2)
+    _plot_phase(
+        ax_excitation, t_excitation, y_excitation, state_names, 'Excitation', colors, label_format, legend_fontsize,
+        max_points, xscale
+    )
+    _plot_phase(
+        ax_decay, t_decay, y_decay, state_names, 'Decay', colors, label_format, legend_fontsize, max_points, xscale
+    )
+    fig.tight_layout()
+
+    if fig_path:
+        save_figure(fig, fig_path, fig_format, dpi=dpi)
+        print(f"Figure successfully saved to {fig_path}\n")
+    return fig
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import pstats
+import logging
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from colorama import Fore
+from kinetics.cache import cache_counts
+
+logger = logging.getLogger()
+
+# stage timers and solver counters are always recorded, these add overhead and are opt-in:
+# 'cprofile' records every Python call, 'memory' traces allocations for the peak memory per stage
+PROFILERS = ('cprofile', 'memory')
+PROFILE_FILES = {'json': 'profile.json', 'cprofile': 'profile.prof'}
+SOLVER_COUNTERS = ('nfev', 'njev', 'nlu')
+
+
+def _reset_peak():
+    # tracemalloc.reset_peak is new in Python 3.9, clearing the traces resets the peak as well
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.clear_traces()
+
+
+class RunProfiler:
+    def __init__(self, profilers=None, top=15):
+        if isinstance(profilers, str):
+            profilers = [profilers]
+        profilers = tuple(profilers or ())
+        for name in profilers:
+            if name not in PROFILERS:
+                raise ValueError(f"Unknown profiler '{name}', choose one of {PROFILERS}.")
+        self.profilers = profilers
+        self.top = top
+        self.stages = {}
+        self.solvers = {}
+        self.total = {}
+        self.cache = {}
+        self.peak_memory = 0
+        self._running = {}
+        self._start = None
+        self._cache_counts = (0, 0)
+        self._cprofile = None
+        self._owns_tracing = False
+
+    @property
+    def memory(self):
+        return 'memory' in self.profilers and tracemalloc.is_tracing()
+
+    def enable(self):
+        self._start = (time.perf_counter(), time.process_time())
+        self._cache_counts = cache_counts()
+        if 'memory' in self.profilers and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        if 'cprofile' in self.profilers:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def disable(self):
+        # safe to call twice, the run context calls it again after finish()
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    def start(self, name):
+        if self.memory:
+            _reset_peak()
+            self._running[name] = (time.perf_counter(), time.process_time(), tracemalloc.get_traced_memory()[0])
+        else:
+            self._running[name] = (time.perf_counter(), time.process_time(), 0)
+
+    def stop(self, name):
+        wall, cpu, memory = self._running.pop(name)
+        stage = {'wall': time.perf_counter() - wall, 'cpu': time.process_time() - cpu}
+        if self.memory:
+            # peak allocation above what was already allocated when the stage started
+            stage['peak_memory'] = tracemalloc.get_traced_memory()[1] - memory
+            self.peak_memory = max(self.peak_memory, stage['peak_memory'])
+        self.stages[name] = stage
+        return stage
+
+    @contextmanager
+    def stage(self, name):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def record_solver(self, name, solution):
+        # function evaluations, Jacobian evaluations and LU decompositions of solve_ivp,
+        # the propagator engines report zero for all three
+        counters = {key: int(getattr(solution, key, 0)) for key in SOLVER_COUNTERS}
+        counters['n_points'] = len(solution.t)
+        self.solvers[name] = counters
+        return counters
+
+    def wall_times(self):
+        return {name: stage['wall'] for name, stage in self.stages.items()}
+
+    def top_functions(self):
+        if self._cprofile is None:
+            return []
+        stats = pstats.Stats(self._cprofile).stats
+        # (primitive calls, calls, own time, cumulative time, callers) per (file, line, function)
+        ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top]
+        return [
+            {
+                'function': f"{os.path.basename(filename)}:{line}({function})",
+                'ncalls': calls, 'tottime': own_time, 'cumtime': cumulative,
+            }
+            for (filename, line, function), (_, calls, own_time, cumulative, _) in ranked
+        ]
+
+    def as_dict(self):
+        profile = {
+            'profilers': list(self.profilers),
+            'stages': self.stages,
+            'total': self.total,
+            'solvers': self.solvers,
+            'excitation_cache': self.cache,
+        }
+        if 'memory' in self.profilers:
+            profile['peak_memory'] = self.peak_memory
+        if self._cprofile is not None:
+            profile['top_functions'] = self.top_functions()
+        return profile
+
+    def finish(self, results_folder=None):
+        self.disable()
+        if self._start is not None:
+            wall, cpu = self._start
+            self.total = {'wall': time.perf_counter() - wall, 'cpu': time.process_time() - cpu}
+        hits, misses = self._cache_counts
+        total_hits, total_misses = cache_counts()
+        self.cache = {'hits': total_hits - hits, 'misses': total_misses - misses}
+
+        profile = self.as_dict()
+        self.report(profile)
+        if results_folder is not None:
+            write_profile(profile, os.path.join(results_folder, PROFILE_FILES['json']))
+            if self._cprofile is not None:
+                self._cprofile.dump_stats(os.path.join(results_folder, PROFILE_FILES['cprofile']))
+        return profile
+
+    def report(self, profile=None):
+        profile = profile or self.as_dict()
+        logger.info(Fore.CYAN + "\n >>> Run profile (wall / CPU time):")
+        rows = list(profile['stages'].items())
+        if profile['total']:
+            rows.append(('total', profile['total']))
+        for name, stage in rows:
+            memory = f"   peak {stage['peak_memory'] / 2 ** 20:8.2f} MiB" if 'peak_memory' in stage else ""
+            logger.info(f"  {name:<12}{stage['wall']:10.3f} s {stage['cpu']:10.3f} s{memory}", extra={'data': dict(stage, stage=name)})
+
+        for name, counters in profile['solvers'].items():
+            logger.info(
+                f"  {name} solver: " + ", ".join(f"{key}={counters[key]}" for key in SOLVER_COUNTERS),
+                extra={'data': dict(counters, solver=name)}
+            )
+        # the closed-form models never touch the excitation cache
+        if any(profile['excitation_cache'].values()):
+            logger.info(f"  excitation cache: {profile['excitation_cache']['hits']} hits, {profile['excitation_cache']['misses']} misses")
+
+        if profile.get('top_functions'):
+            logger.info(Fore.CYAN + "\n >>> Top functions by cumulative time:")
+            logger.info(f"  {'cumtime':>10} {'tottime':>10} {'ncalls':>9}  function")
+            for entry in profile['top_functions']:
+                logger.info(f"  {entry['cumtime']:10.3f} {entry['tottime']:10.3f} {entry['ncalls']:9d}  {entry['function']}")
+        logger.info("")
+
+
+@contextmanager
+def profile_run(profilers=None, top=15):
+    # the opt-in profilers are switched off again even if the run fails half way
+    profiler = RunProfiler(profilers, top=top)
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+
+
+def write_profile(profile, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(profile, file, indent=2)
+
+
+def flatten_profile(profile):
+    # one flat row per run, e.g. decay_wall or excitation_nfev, for tables across a sweep or batch
+    row = {}
+    for name, stage in profile.get('stages', {}).items():
+        row.update({f"{name}_{key}": value for key, value in stage.items()})
+    row.update({f"total_{key}": value for key, value in profile.get('total', {}).items()})
+    for name, counters in profile.get('solvers', {}).items():
+        row.update({f"{name}_{key}": counters[key] for key in SOLVER_COUNTERS})
+    if 'peak_memory' in profile:
+        row['peak_memory'] = profile['peak_memory']
+    return row
+
+
+def collect_profiles(results_folders):
+    # profile.json of finished runs as flat rows, ready for write_sweep_table
+    rows = []
+    for folder in results_folders:
+        with open(os.path.join(folder, PROFILE_FILES['json']), encoding='utf-8') as file:
+            row = {'results_folder': folder}
+            row.update(flatten_profile(json.load(file)))
+            rows.append(row)
+    return rows
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from scipy import sparse
+from scipy.linalg import expm
+from scipy.sparse.linalg import expm_multiply, splu, norm as sparse_norm
+
+ENGINES = ('radau', 'expm', 'krylov')
+
+# Carathéodory-Fejér (14, 14) rational approximation of exp(x) on (-inf, 0], poles and residues of
+# Gallopoulos & Saad as in Expokit's chbv: exp(x) ~ CF_ALPHA0 + Re sum_i alpha_i / (-x - theta_i)
+CF_ALPHA = np.array([
+    0.557503973136501826e+02 - 0.204295038779771857e+03j, -0.938666838877006739e+02 + 0.912874896775456363e+02j,
+    0.469965415550370835e+02 - 0.116167609985818103e+02j, -0.961424200626061065e+01 - 0.264195613880262669e+01j,
+    0.752722063978321642e+00 + 0.670367365566377770e+00j, -0.188781253158648576e-01 - 0.343696176445802414e-01j,
+    0.143086431411801849e-03 + 0.287221133228814096e-03j,
+])
+CF_THETA = np.array([
+    -0.562314417475317895e+01 + 0.119406921611247440e+01j, -0.508934679728216110e+01 + 0.358882439228376881e+01j,
+    -0.399337136365302569e+01 + 0.600483209099604664e+01j, -0.226978543095856366e+01 + 0.846173881758693369e+01j,
+    0.208756929753827868e+00 + 0.109912615662209418e+02j, 0.370327340957595652e+01 + 0.136563731924991884e+02j,
+    0.889777151877331107e+01 + 0.166309842834712071e+02j,
+])
+# the constant term is set so that r(0) = 1 exactly: a rate matrix then keeps its total population over
+# any number of steps, and the error stays below 5e-12 everywhere on (-inf, 0]
+CF_ALPHA0 = 1.0 - float(np.real(np.sum(CF_ALPHA / -CF_THETA)))
+# up to this many states the krylov engine solves the shifted systems densely
+DENSE_SHIFTED_STATES = 16
+
+
+class PropagatorSolution:
+    # mirrors the attributes of the OdeResult returned by solve_ivp
+    def __init__(self, t, y, sol, method):
+        self.t = t
+        self.y = y
+        self.sol = sol
+        self.method = method
+        self.status = 0
+        self.success = True
+        self.message = f"Propagated exactly with the matrix exponential ({method})."
+        self.nfev = 0
+        self.njev = 0
+        self.nlu = 0
+
+
+class MatrixExponentialPropagator:
+    # evaluates P(t) = expm(A * (t - t0)) @ P0 for a constant rate matrix A
+    def __init__(self, A, t0=0.0, cond_limit=1e8, residual_limit=1e-10):
+        self.A = np.asarray(A, dtype=np.float64)
+        self.t0 = t0
+        self.eigenvalues = None
+        self.eigenvectors = None
+
+        # use the eigendecomposition only when it reproduces A accurately,
+        # otherwise fall back to scaling-and-squaring for every time point
+        eigenvalues, eigenvectors = np.linalg.eig(self.A)
+        cond = np.linalg.cond(eigenvectors)
+        if np.isfinite(cond) and cond < cond_limit:
+            reconstructed = (eigenvectors * eigenvalues) @ np.linalg.inv(eigenvectors)
+            scale = max(np.abs(self.A).max(), np.finfo(float).tiny)
+            residual = np.abs(reconstructed - self.A).max() / scale
+            if residual < residual_limit:
+                self.eigenvalues = eigenvalues
+                self.eigenvectors = eigenvectors
+
+        self.method = 'eigen' if self.eigenvalues is not None else 'scaling-and-squaring'
+
+    def propagate(self, y0, t):
+        y0 = np.asarray(y0, dtype=np.float64)
+        scalar = np.ndim(t) == 0
+        dt = np.atleast_1d(np.asarray(t, dtype=np.float64)) - self.t0
+
+        if self.eigenvalues is not None:
+            coeffs = np.linalg.solve(self.eigenvectors, y0)
+            y = self.eigenvectors @ (coeffs[:, None] * np.exp(np.outer(self.eigenvalues, dt)))
+            y = y.real
+        else:
+            y = np.empty((y0.size, dt.size))
+            for idx, dt_i in enumerate(dt):
+                y[:, idx] = expm(self.A * dt_i) @ y0
+
+        return y[:, 0] if scalar else y
+
+
+def propagate_expm(A, t_span, y0, t_eval=None):
+    if sparse.issparse(A):
+        A = A.toarray()
+    t0 = t_span[0]
+    if t_eval is None:
+        t_eval = np.asarray(t_span, dtype=np.float64)
+    t_eval = np.asarray(t_eval, dtype=np.float64)
+
+    propagator = MatrixExponentialPropagator(A, t0=t0)
+    y0 = np.asarray(y0, dtype=np.float64)
+
+    def sol(t):
+        return propagator.propagate(y0, t)
+
+    return PropagatorSolution(t_eval, sol(t_eval), sol, propagator.method)
+
+
+class KrylovPropagator:
+    # applies expm(A * dt) to a vector without forming it, so the cost grows with nnz(A); short steps
+    # go through expm_multiply, whose cost also grows with ||A dt||_1, and the longer steps of a decay
+    # window that spans many lifetimes through the seven shifted solves of the CF approximation, which
+    # holds for the real (or nearly real) spectra of the rate matrices
+    def __init__(self, A, t0=0.0, max_norm_dt=1.0, step_rtol=1e-10, dense_states=DENSE_SHIFTED_STATES):
+        self.A = sparse.csc_matrix(A, dtype=np.float64)
+        self.t0 = t0
+        self.norm = float(sparse_norm(self.A, 1))
+        self.max_norm_dt = max_norm_dt
+        self.step_rtol = step_rtol
+        self.nlu = 0
+        self._factors = None
+
+        n = self.A.shape[0]
+        if n <= dense_states:
+            # a handful of states is cheaper to solve in one batched dense call than through splu
+            self._dense = self.A.toarray()
+        else:
+            # the shifted matrices -dt A - theta I share the pattern of A + I, only their data is rebuilt
+            self._dense = None
+            pattern = (abs(self.A) + sparse.identity(n, format='csc')).tocsc()
+            pattern.sort_indices()
+            rows, cols = pattern.indices, np.repeat(np.arange(n), np.diff(pattern.indptr))
+            self._pattern = (pattern.indices, pattern.indptr)
+            self._a_data = np.asarray(self.A[rows, cols]).ravel()
+            self._diagonal = (rows == cols).astype(np.float64)
+
+    def step(self, y, dt):
+        if dt == 0:
+            return np.array(y, dtype=np.float64)
+        # the batched dense solve costs less than expm_multiply even for the shortest steps
+        if self._dense is not None or self.norm * abs(dt) > self.max_norm_dt:
+            return self._rational_step(np.asarray(y, dtype=np.float64), dt)
+        return expm_multiply(self.A * dt, y)
+
+    def _rational_step(self, y, dt):
+        if self._dense is not None:
+            shifted = -dt * self._dense - CF_THETA[:, None, None] * np.eye(y.size)
+            solved = np.linalg.solve(shifted, np.broadcast_to(y, (CF_THETA.size, y.size))[..., None])[..., 0]
+            self.nlu += CF_THETA.size
+            return CF_ALPHA0 * y + np.real(CF_ALPHA @ solved)
+
+        # the steps of a uniform run of the grid differ by round-off only and share their factorizations
+        if self._factors is None or abs(self._factors[0] - dt) > self.step_rtol * abs(dt):
+            indices, indptr = self._pattern
+            shape = self.A.shape
+            self._factors = (dt, [
+                splu(sparse.csc_matrix((-dt * self._a_data - theta * self._diagonal, indices, indptr), shape=shape))
+                for theta in CF_THETA
+            ])
+            self.nlu += CF_THETA.size
+
+        rhs = y.astype(np.complex128)
+        result = CF_ALPHA0 * y
+        for alpha, lu in zip(CF_ALPHA, self._factors[1]):
+            result = result + np.real(alpha * lu.solve(rhs))
+        return result
+
+    def propagate_grid(self, y0, t):
+        # march along the sorted grid, each step starting from the previous point
+        t = np.asarray(t, dtype=np.float64)
+        y = np.empty((len(y0), t.size))
+        current_t, current_y = self.t0, np.asarray(y0, dtype=np.float64)
+        for idx, ti in enumerate(t):
+            current_y = self.step(current_y, ti - current_t)
+            current_t = ti
+            y[:, idx] = current_y
+        return y
+
+
+def propagate_krylov(A, t_span, y0, t_eval=None):
+    t0 = t_span[0]
+    if t_eval is None:
+        t_eval = np.asarray(t_span, dtype=np.float64)
+    t_eval = np.asarray(t_eval, dtype=np.float64)
+    if np.any(np.diff(t_eval) < 0):
+        raise ValueError("t_eval must be sorted for the krylov engine.")
+
+    propagator = KrylovPropagator(A, t0=t0)
+    y0 = np.asarray(y0, dtype=np.float64)
+    y = propagator.propagate_grid(y0, t_eval)
+
+    def sol(t):
+        # restart from the closest stored point before t
+        scalar = np.ndim(t) == 0
+        t = np.atleast_1d(np.asarray(t, dtype=np.float64))
+        starts = np.searchsorted(t_eval, t, side='right') - 1
+        out = np.empty((y0.size, t.size))
+        for idx, (ti, start) in enumerate(zip(t, starts)):
+            if start < 0:
+                out[:, idx] = propagator.step(y0, ti - t0)
+            else:
+                out[:, idx] = propagator.step(y[:, start], ti - t_eval[start])
+        return out[:, 0] if scalar else out
+
+    solution = PropagatorSolution(t_eval, y, sol, 'krylov')
+    solution.nlu = propagator.nlu
+    return solution
+
+
+def _batch_chunk_size(n_states, n_times, max_bytes):
+    # the complex mode amplitudes and the real output dominate the memory of one chunk
+    per_item = n_states * n_times * (16 + 8) + n_states * n_states * 32
+    return max(1, int(max_bytes // per_item))
+
+
+def propagate_batch(A, y0, t, t0=0.0, chunk_size=None, max_bytes=2 ** 24, cond_limit=1e8, residual_limit=1e-10):
+    # P_b(t) = expm(A_b (t - t0)) @ y0_b for a (B, N, N) stack of rate matrices, returns (B, N, T)
+    A = np.asarray(A, dtype=np.float64)
+    y0 = np.asarray(y0, dtype=np.float64)
+    if A.ndim != 3 or A.shape[1] != A.shape[2]:
+        raise ValueError("A must be a (B, N, N) stack of rate matrices.")
+    if y0.ndim == 1:
+        y0 = np.broadcast_to(y0, A.shape[:2])
+    if y0.shape != A.shape[:2]:
+        raise ValueError(f"y0 must have shape {A.shape[:2]}, got {y0.shape}.")
+
+    dt = np.atleast_1d(np.asarray(t, dtype=np.float64)) - t0
+    n_batch, n_states = A.shape[:2]
+    if chunk_size is None:
+        chunk_size = _batch_chunk_size(n_states, dt.size, max_bytes)
+
+    y = np.empty((n_batch, n_states, dt.size))
+    for start in range(0, n_batch, chunk_size):
+        stop = min(start + chunk_size, n_batch)
+        A_chunk = A[start:stop]
+        eigenvalues, eigenvectors = np.linalg.eig(A_chunk)
+
+        # members whose eigendecomposition is unreliable are redone one by one below
+        with np.errstate(all='ignore'):
+            cond = np.linalg.cond(eigenvectors)
+        good = np.isfinite(cond) & (cond < cond_limit)
+        if np.any(good):
+            V = eigenvectors[good]
+            V_inv = np.linalg.inv(V)
+            reconstructed = np.matmul(V * eigenvalues[good][:, None, :], V_inv)
+            scale = np.maximum(np.abs(A_chunk[good]).max(axis=(1, 2)), np.finfo(float).tiny)
+            residual = np.abs(reconstructed - A_chunk[good]).max(axis=(1, 2)) / scale
+            good[good] = residual < residual_limit
+
+        if np.any(good):
+            V = eigenvectors[good]
+            lam = eigenvalues[good]
+            # rate matrices of detailed-balance-like networks have real spectra, which halves the work
+            if not np.iscomplexobj(V) or (np.all(lam.imag == 0) and np.all(V.imag == 0)):
+                V = V.real
+                lam = lam.real
+            coeffs = np.linalg.solve(V, y0[start:stop][good][..., None].astype(V.dtype))[..., 0]
+            modes = np.exp(lam[:, :, None] * dt[None, None, :])
+            modes *= coeffs[:, :, None]
+            y[start:stop][good] = np.matmul(V, modes).real
+
+        for idx in np.flatnonzero(~good):
+            propagator = MatrixExponentialPropagator(A_chunk[idx], t0=0.0, cond_limit=cond_limit, residual_limit=residual_limit)
+            y[start + idx] = propagator.propagate(y0[start + idx], dt)
+
+    return y
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from kinetics.storage import ARRAY_NAMES, load_kinetics_data
+
+
+class KineticsResult:
+    # everything one run produces; the population arrays are given either directly or as
+    # zero-argument loaders that are only called on first access
+    __slots__ = (
+        'model', 'rate_constants', 'pulse_end', 'quantum_yields', 'process_yields', 'decay_modes', 'decay_fit',
+        'error_estimates', 'timings', 'profile', 'results_folder', '_arrays', '_loaders'
+    )
+
+    def __init__(
+        self, model, rate_constants, pulse_end=None, quantum_yields=None, process_yields=None, decay_modes=None,
+        decay_fit=None, error_estimates=None, timings=None, profile=None, results_folder=None, arrays=None
+    ):
+        self.model = model
+        self.rate_constants = dict(rate_constants)
+        self.pulse_end = dict(pulse_end or {})
+        self.quantum_yields = dict(quantum_yields or {})
+        self.process_yields = dict(process_yields or {})
+        self.decay_modes = list(decay_modes or [])
+        self.decay_fit = decay_fit
+        self.error_estimates = dict(error_estimates or {})
+        self.timings = dict(timings or {})
+        self.profile = profile
+        self.results_folder = results_folder
+        self._arrays = {}
+        self._loaders = {}
+        for name, value in (arrays or {}).items():
+            if name not in ARRAY_NAMES:
+                raise ValueError(f"Unknown array '{name}', choose one of {ARRAY_NAMES}.")
+            if callable(value):
+                self._loaders[name] = value
+            else:
+                self._arrays[name] = value
+
+    @classmethod
+    def from_data_file(cls, model, data_path, **fields):
+        # the arrays of a finished run, read from any of the data formats when first needed
+        cache = {}
+
+        def loader(name):
+            def load():
+                if not cache:
+                    cache.update(load_kinetics_data(data_path))
+                return cache[name]
+            return load
+
+        return cls(model, fields.pop('rate_constants', {}), arrays={name: loader(name) for name in ARRAY_NAMES}, **fields)
+
+    def array(self, name):
+        if name not in self._arrays:
+            if name not in self._loaders:
+                raise KeyError(f"No '{name}' array in this result.")
+            self._arrays[name] = np.asarray(self._loaders[name]())
+        return self._arrays[name]
+
+    def is_loaded(self, name):
+        return name in self._arrays
+
+    def release(self):
+        # drop the materialized arrays that can be rebuilt from their loaders
+        for name in self._loaders:
+            self._arrays.pop(name, None)
+
+    @property
+    def t_excitation(self):
+        return self.array('t_excitation')
+
+    @property
+    def y_excitation(self):
+        return self.array('y_excitation')
+
+    @property
+    def t_decay(self):
+        return self.array('t_decay')
+
+    @property
+    def y_decay(self):
+        return self.array('y_decay')
+
+    def population(self, state, phase='decay'):
+        if phase not in ('excitation', 'decay'):
+            raise ValueError(f"Unknown phase '{phase}', choose 'excitation' or 'decay'.")
+        return self.array('y_' + phase)[self.model.index(state)]
+
+    @property
+    def plqy(self):
+        # fluorescence quantum yield in percent
+        return self.quantum_yields.get('QY_fl', np.nan)
+
+    @property
+    def lifetimes(self):
+        # lifetimes of the decay modes, fastest first
+        return np.array([mode.lifetime for mode in self.decay_modes])
+
+    def summary(self):
+        # plain floats and lists only, ready for json.dump or a table row
+        summary = {
+            'model': self.model.name,
+            'rate_constants': {key: float(value) for key, value in self.rate_constants.items()},
+            'pulse_end': {state: float(value) for state, value in self.pulse_end.items()},
+            'quantum_yields': {key: float(value) for key, value in self.quantum_yields.items()},
+            'process_yields': {key: float(value) for key, value in self.process_yields.items()},
+            'lifetimes': [float(value) for value in self.lifetimes],
+            'emission_fractions': [float(mode.emission_fraction) for mode in self.decay_modes],
+            'timings': dict(self.timings),
+        }
+        if self.decay_fit is not None:
+            summary['decay_fit'] = {key: float(value) for key, value in self.decay_fit.items()}
+        if self.error_estimates:
+            summary['error_estimates'] = self.error_estimates
+        if self.profile is not None:
+            summary['profile'] = self.profile
+        return summary
+
+    def __repr__(self):
+        lifetimes = ", ".join(f"{tau:.3e}" for tau in self.lifetimes)
+        return f"KineticsResult('{self.model.name}', PLQY={self.plqy:.2f}%, lifetimes=[{lifetimes}])"
@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from colorama import Fore
+from scipy import sparse as sp_sparse
+from scipy.sparse.linalg import expm_multiply, norm as sparse_norm
+from kinetics.propagator import ENGINES, MatrixExponentialPropagator, propagate_batch, propagate_expm, propagate_krylov
+from kinetics.cache import excitation_cache, excitation_key, populations_from_excitation
+from kinetics.plotting import PLOT_MAX_POINTS, downsample_curve, save_figure
+from kinetics.fitting import FIT_METHODS, fit_two_exponentials_varpro, initial_guess, log_residuals, two_exp
+
+# factors on the class tolerances of each solver, so 'default' keeps exactly the tolerances the
+# solvers always used; 'screening' trades accuracy for speed, 'reference' is for publication runs
+TOLERANCE_PRESETS = {
+    'screening': {'rtol': 1e3, 'atol': 1e3, 'max_step': 1e3},
+    'default': {'rtol': 1.0, 'atol': 1.0, 'max_step': 1.0},
+    'reference': {'rtol': 1e-2, 'atol': 1e-2, 'max_step': 1.0},
+}
+# output points an opt-in error estimate checks against the matrix exponential
+ERROR_SAMPLES = 32
+# the sparse reference marches expm_multiply, whose cost grows with ||A dt||_1; later points are not checked
+ERROR_NORM_LIMIT = 1e4
+
+
+def solve_batch(model, rate_constants, time_pulse, num_photon, t_eval, chunk_size=None):
+    # excitation up to the pulse end followed by the free decay for B rate-constant sets at once,
+    # returns the (B, N) pulse-end populations and the (B, N, T) decay populations
+    A_excitation = model.rate_matrices(rate_constants, excitation=True)
+    A_decay = model.rate_matrices(rate_constants, excitation=False)
+    y0 = model.initial_populations(num_photon)
+    pulse_end = propagate_batch(A_excitation, y0, [time_pulse], chunk_size=chunk_size)[:, :, 0]
+    decay = propagate_batch(A_decay, pulse_end, t_eval, chunk_size=chunk_size)
+    return pulse_end, decay
+
+
+class KineticSolver:
+    # subclasses bind a KineticModel here, or pass one explicitly with model=
+    model = None
+    rtol = 1e-8
+    atol = 1e-13
+    max_step = 1e-8
+    # output points checked against the matrix exponential after every solve, 0 switches the check off
+    error_samples = 0
+
+    def __init__(
+        self, time_pulse=None, num_photon=None, model=None, tolerance='default', rtol=None, atol=None, max_step=None,
+        error_samples=None, **params
+    ):
+        if model is not None:
+            self.model = model
+        if self.model is None:
+            raise ValueError("No kinetic model given.")
+        if tolerance not in TOLERANCE_PRESETS:
+            raise ValueError(f"Unknown tolerance preset '{tolerance}', choose one of {tuple(TOLERANCE_PRESETS)}.")
+        self.tolerance = tolerance
+        # the class tolerances scaled by the preset, explicit values take precedence
+        for name, value in (('rtol', rtol), ('atol', atol), ('max_step', max_step)):
+            if value is None:
+                value = getattr(type(self), name) * TOLERANCE_PRESETS[tolerance][name]
+            setattr(self, name, float(value))
+        if error_samples is not None:
+            self.error_samples = int(error_samples)
+        self.error_estimate = None
+        self.params = params
+        for key, value in params.items():
+            setattr(self, key, value)
+        self.solutions = None
+        self.time_pulse = time_pulse
+        self.num_photon = num_photon
+
+    @property
+    def state_names(self):
+        return self.model.states
+
+    def rate_matrix(self, rate_constants=None, sparse=False):
+        raise NotImplementedError
+
+    def _integrate(self, A_numeric, t_span, y0, t_eval, engine):
+        if engine == 'krylov':
+            # sparse Krylov propagation, the full matrix exponential is never formed
+            solution = propagate_krylov(A_numeric, t_span, y0, t_eval=t_eval)
+            self.solutions = solution
+            self.error_estimate = self._estimate_error(A_numeric, t_span[0], y0, solution)
+            return solution
+
+        if engine == 'expm':
+            # the rate matrix is constant, so P(t) = expm(A t) @ P0 is exact at every t_eval and there
+            # is nothing to estimate
+            solution = propagate_expm(A_numeric, t_span, y0, t_eval=t_eval)
+            self.solutions = solution
+            self.error_estimate = None
+            return solution
+
+        # scipy.integrate also loads scipy.optimize, only the Radau engine pays for it
+        from scipy.integrate import solve_ivp
+
+        if sp_sparse.issparse(A_numeric):
+            # a sparse Jacobian makes Radau factorize its implicit steps with sparse LU
+            A_numeric = sp_sparse.csc_matrix(A_numeric)
+
+        def odes(t, y):
+            return A_numeric @ y
+
+        def jac(t, y):
+            return A_numeric
+
+        # Radau method to solve ODE.
+        solution = solve_ivp(
+            odes,
+            t_span,
+            y0,
+            t_eval=t_eval,
+            method='Radau',
+            jac=jac,
+            rtol=self.rtol,
+            atol=self.atol,
+            max_step=self.max_step,
+            dense_output=True
+        )
+
+        if not solution.success:
+            raise RuntimeError(f"ODE solver failed: {solution.message}")
+
+        self.solutions = solution
+        self.error_estimate = self._estimate_error(A_numeric, t_span[0], y0, solution)
+        return solution
+
+    def _estimate_error(self, A_numeric, t0, y0, solution):
+        # a-posteriori check: expm(A (t - t0)) @ y0 is exact for the constant rate matrix, so the output
+        # points closest to error_samples log-spaced times after t0 are recomputed with it, on any grid
+        t_values = np.asarray(solution.t)
+        after = np.flatnonzero(t_values > t0)
+        if not self.error_samples or after.size == 0:
+            return None
+
+        targets = t0 + np.geomspace(t_values[after[0]] - t0, t_values[-1] - t0, self.error_samples)
+        indices = np.unique(np.clip(np.searchsorted(t_values, targets), after[0], t_values.size - 1))
+        y0 = np.asarray(y0, dtype=np.float64)
+        if sp_sparse.issparse(A_numeric):
+            # sparse models are large, march along the sorted samples without forming expm(A t)
+            A_numeric = sp_sparse.csr_matrix(A_numeric)
+            norm = sparse_norm(A_numeric, 1)
+            indices = indices[norm * (t_values[indices] - t0) <= ERROR_NORM_LIMIT]
+            if indices.size == 0:
+                return None
+            y_reference = np.empty((y0.size, indices.size))
+            current_t, current_y = t0, y0
+            for column, idx in enumerate(indices):
+                current_y = expm_multiply(A_numeric * (t_values[idx] - current_t), current_y)
+                current_t = t_values[idx]
+                y_reference[:, column] = current_y
+        else:
+            y_reference = MatrixExponentialPropagator(A_numeric, t0=t0).propagate(y0, t_values[indices])
+
+        error = np.abs(np.asarray(solution.y)[:, indices] - y_reference)
+        return {
+            'samples': int(indices.size),
+            'max_abs_error': float(error.max()),
+            # error in units of the requested atol + rtol * |y|, at most about 1 when the tolerances hold
+            'tolerance_ratio': float((error / (self.atol + self.rtol * np.abs(y_reference))).max()),
+        }
+
+    def display_results(self):
+        if self.solutions:
+            t = self.solutions.t
+            print(Fore.YELLOW + "\n >>> Numerical solution : ")
+            for idx, state in enumerate(self.state_names):
+                values = self.solutions.y[idx]
+                print(Fore.YELLOW + f"\n Population evolution of state: {state} ")
+                for ti, vi in zip(t[:5], values[:5]):
+                    print(f"  {state}({ti:.3e} s) = {vi:.3e}")
+                print("  ...")
+                for ti, vi in zip(t[-5:], values[-5:]):
+                    print(f"  {state}({ti:.3e} s) = {vi:.3e}")
+
+
+class ExcitationSolver(KineticSolver):
+    atol = 1e-12
+    max_step = 1e-12
+
+    def rate_matrix(self, rate_constants=None, sparse=False):
+        rate_constants = self.params if rate_constants is None else rate_constants
+        if sparse:
+            return self.model.sparse_rate_matrix(rate_constants, excitation=True)
+        return self.model.rate_matrix(rate_constants, excitation=True)
+
+    def solve_numerically(self, t_span=None, y0=None, t_eval=None, engine='radau', sparse=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', choose one of {ENGINES}.")
+
+        if y0 is None:
+            # everything starts in the ground state
+            y0 = self.model.initial_populations(self.num_photon)
+
+        A_numeric = self.rate_matrix(sparse=self.model.use_sparse(sparse))
+        return self._integrate(A_numeric, t_span, y0, t_eval, engine)
+
+    def get_solution_at_time(self):
+        if self.time_pulse is None:
+            raise ValueError("Please set a valid pulse time.")
+
+        if self.solutions is None:
+            raise RuntimeError("No solution available.")
+
+        return tuple(self.solutions.sol(self.time_pulse))
+
+    def cache_key(self, engine, t_span, sparse=None, **options):
+        return excitation_key(
+            self.model, self.params, self.time_pulse, self.num_photon, engine=engine,
+            t_span=tuple(float(t) for t in t_span), rtol=self.rtol, atol=self.atol, max_step=self.max_step,
+            sparse=self.model.use_sparse(sparse), **options
+        )
+
+    def propagate_after_pulse(self, t_eval):
+        # absorption stays on for the rest of the excitation window and the rate matrix is constant,
+        # so the curve after the pulse follows exactly from the pulse-end populations
+        propagator = MatrixExponentialPropagator(self.rate_matrix(), t0=self.time_pulse)
+        return propagator.propagate(self.get_solution_at_time(), np.asarray(t_eval, dtype=np.float64))
+
+
+class DecaySolver(KineticSolver):
+    excitation_solver_class = ExcitationSolver
+    # initial guess of the constant offset in the two-exponential fit, as a fraction of num_photon
+    fit_offset_guess = 1.0
+    # log-spaced bins the varpro fit averages the decay into, None fits every sample
+    fit_bins = 400
+
+    def rate_matrix(self, rate_constants=None, sparse=False):
+        # no absorption once the pulse is over
+        rate_constants = self.params if rate_constants is None else rate_constants
+        if sparse:
+            return self.model.sparse_rate_matrix(rate_constants, excitation=False)
+        return self.model.rate_matrix(rate_constants, excitation=False)
+
+    def solve_numerically(self, t_span=None, y0=None, t_eval=None, t_span_excitation=None, t_eval_excitation=None, rate_constants=None, engine='radau', excitation=None, sparse=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', choose one of {ENGINES}.")
+
+        # reuse the pulse-end populations when they are already known
+        if y0 is None:
+            y0 = self._initial_populations(excitation, t_span_excitation, t_eval_excitation, rate_constants, engine, sparse)
+        y0 = [float(value) for value in y0]
+
+        # initial conditions
+        print("\n" + Fore.YELLOW + "Initial Population for decay:")
+        for idx, (state, value) in enumerate(zip(self.state_names, y0)):
+            end = "\n" if idx == len(y0) - 1 else ""
+            print(Fore.YELLOW + f"  {state} : {value:>10.3e}{end}")
+
+        A_numeric = self.rate_matrix(sparse=self.model.use_sparse(sparse))
+        return self._integrate(A_numeric, t_span, y0, t_eval, engine)
+
+    def _initial_populations(self, excitation, t_span_excitation, t_eval_excitation, rate_constants, engine, sparse=None):
+        if excitation is not None:
+            return populations_from_excitation(excitation, self.time_pulse)
+
+        if rate_constants is None:
+            rate_constants = self.params
+        if t_span_excitation is None:
+            t_span_excitation = (0, self.time_pulse)
+
+        # the excitation runs under the same preset, with the excitation solver's own tolerances
+        icsolver = self.excitation_solver_class(
+            time_pulse=self.time_pulse, num_photon=self.num_photon, model=self.model, tolerance=self.tolerance, **rate_constants
+        )
+        key = icsolver.cache_key(engine, t_span_excitation, sparse=sparse)
+
+        def compute():
+            icsolver.solve_numerically(t_span=t_span_excitation, t_eval=t_eval_excitation, engine=engine, sparse=sparse)
+            return icsolver.get_solution_at_time()
+
+        return excitation_cache.get_or_compute(key, compute)
+
+    def _fit_differential_evolution(self, t_data, s1_data, x0_init):
+        from scipy.optimize import differential_evolution, least_squares
+
+        bounds = [
+            (0, self.num_photon),
+            (np.log10(1e-12), np.log10(1)),
+            (0, self.num_photon),
+            (np.log10(1e-12), np.log10(1)),
+            (0, self.num_photon),
+        ]
+        lower = np.array([b[0] for b in bounds])
+        upper = np.array([b[1] for b in bounds])
+        popsize = 100
+        n_params = len(bounds)
+
+        init_pop = np.random.rand(popsize, n_params)
+        init_pop = lower + init_pop * (upper - lower)
+        init_pop[0] = x0_init
+
+        result_global = differential_evolution(
+            lambda p: np.sum(log_residuals(p, t_data, s1_data) ** 2),
+            bounds=bounds,
+            init=init_pop,
+            maxiter=10000,
+            popsize=popsize,
+            tol=1e-8,
+            seed=42,
+            polish=False
+        )
+
+        result_local = least_squares(
+            log_residuals,
+            x0=result_global.x,
+            args=(t_data, s1_data),
+            bounds=(lower, upper),
+            method='trf',
+            loss='soft_l1',
+            ftol=1e-12,
+            xtol=1e-12,
+            gtol=1e-12
+        )
+        return result_local.x
+
+    def fit_s1_with_two_exponentials(self, t_data, s1_data, fit_path=None, method='varpro'):
+        if method not in FIT_METHODS:
+            raise ValueError(f"Unknown fit method '{method}', choose one of {FIT_METHODS}.")
+
+        x0_init = initial_guess(t_data, s1_data, self.num_photon, offset_guess=self.fit_offset_guess)
+
+        print(Fore.CYAN + "\n" + "—" * 40)
+        print(Fore.CYAN + "\n Initial Two Exponential Fit:")
+        print(Fore.CYAN + "\n" + "—" * 40)
+        print(Fore.CYAN + "\n Model:")
+        print(Fore.CYAN + "\n y = A1 * exp(-t/tau1) + A2 * exp(-t/tau2) + C")
+        print(Fore.YELLOW + "\n >>> Initial fitted guess:\n", x0_init)
+
+        if method == 'varpro':
+            params = fit_two_exponentials_varpro(t_data, s1_data, self.num_photon, x0=x0_init, bins=self.fit_bins)
+        else:
+            params = self._fit_differential_evolution(t_data, s1_data, x0_init)
+
+        A1_fit, log10_tau1_fit, A2_fit, log10_tau2_fit, C_fit = params
+        tau1 = 10 ** log10_tau1_fit
+        tau2 = 10 ** log10_tau2_fit
+
+        fitted_params = {
+            "A1":  A1_fit,
+            "tau1": tau1,
+            "A2":  A2_fit,
+            "tau2": tau2,
+            "C":    C_fit
+        }
+
+        print(Fore.CYAN + "\n" + "—" * 40)
+        print(Fore.CYAN + "\n Final Two Exponential Fit:")
+        print(Fore.CYAN + "\n" + "—" * 40)
+        print(Fore.CYAN + "\n Model:")
+        print(Fore.CYAN + "\n y = A1 * exp(-t/tau1) + A2 * exp(-t/tau2) + C")
+        print(Fore.YELLOW + "\n >>> Fitted decay parameters are:\n")
+
+        max_len = max(len(k) for k in fitted_params)
+        for key, val in fitted_params.items():
+            print(f"{key.ljust(max_len)} = {val:.3e}")
+
+        fitted_curve = two_exp(t_data, *params)
+        resid = s1_data - fitted_curve
+        mse = np.mean(resid ** 2)
+        rmse = np.sqrt(mse)
+        r_squared = 1 - np.sum(resid ** 2) / np.sum((s1_data - np.mean(s1_data)) ** 2)
+
+        print(f"\n{'MSE:':<6}{mse:.3e}")
+        print(f"{'RMSE:':<6}{rmse:.3e}")
+        print(f"{'R^2:':<6}{r_squared:.3f}\n")
+
+        if fit_path:
+            from matplotlib.figure import Figure
+
+            fig = Figure(figsize=(8, 5))
+            ax = fig.subplots()
+            ax.plot(*downsample_curve(t_data, s1_data, PLOT_MAX_POINTS), label='Actual data', color='blue')
+            ax.plot(*downsample_curve(t_data, fitted_curve, PLOT_MAX_POINTS),
+                    label='Fitted curve', color='red', linestyle="--")
+            ax.set_xlabel('Time (s)')
+            ax.set_ylabel('Counts (au)')
+            ax.set_yscale('log')
+            ax.set_title(f'{self.model.emissive_state}(t) Decay Fit')
+            ax.legend()
+            ax.grid(True)
+
+            x_min_de, x_max_de = np.min(t_data), np.max(t_data)
+            y_max_de = np.max(s1_data)
+            ax.set_xlim(x_min_de - 0.05 * (x_max_de - x_min_de), x_max_de + 0.05 * (x_max_de - x_min_de))
+            ax.set_ylim(1e-10, float(y_max_de * 1.05))
+
+            save_figure(fig, fit_path)
+            print(Fore.CYAN + f"\n Fitted figure successfully saved to {fit_path} \n")
+
+        return fitted_params
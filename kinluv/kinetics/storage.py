@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import numpy as np
+
+# 'text' is the original kinetics_data.out table, 'npz' a (compressed) numpy archive and 'raw'
+# little-endian float64 columns in one .bin file described by a small JSON header
+DATA_FORMATS = ('text', 'npz', 'raw')
+DATA_EXTENSIONS = {'text': '.out', 'npz': '.npz', 'raw': '.json'}
+RAW_DTYPE = '<f8'
+ARRAY_NAMES = ('t_excitation', 'y_excitation', 't_decay', 'y_decay')
+
+
+def kinetics_data_path(results_folder, data_format='text', stem='kinetics_data'):
+    if data_format not in DATA_FORMATS:
+        raise ValueError(f"Unknown data format '{data_format}', choose one of {DATA_FORMATS}.")
+    return os.path.join(results_folder, stem + DATA_EXTENSIONS[data_format])
+
+
+def decimation_indices(t_values, stride=None, log_points=None):
+    # every stride-th sample, or the first sample at or after each of log_points log-spaced times;
+    # the first and last samples are always kept
+    n = len(t_values)
+    if log_points:
+        t_values = np.asarray(t_values, dtype=np.float64)
+        positive = t_values[t_values > 0]
+        targets = np.logspace(np.log10(positive[0]), np.log10(t_values[-1]), log_points)
+        indices = np.clip(np.searchsorted(t_values, targets), 0, n - 1)
+        return np.unique(np.concatenate(([0], indices, [n - 1])))
+    if stride and stride > 1:
+        return np.unique(np.append(np.arange(0, n, stride), n - 1))
+    return np.arange(n)
+
+
+def format_scientific(values, precision, width):
+    # (n, width) ASCII bytes equal to format(value, f'<{width}.{precision}e') for every value, built
+    # from integer digits instead of one string per value
+    if width < precision + 8:
+        raise ValueError(f"A width of {width} is too narrow for {precision} decimals.")
+    values = np.asarray(values, dtype=np.float64).ravel()
+    magnitude = np.abs(values)
+    out = np.full((values.size, width), ord(' '), dtype=np.uint8)
+
+    regular = np.isfinite(values) & ((magnitude == 0) | (magnitude >= np.finfo(np.float64).tiny))
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        exponent = np.where(regular & (magnitude > 0), np.floor(np.log10(magnitude)), 0).astype(np.int64)
+        scaled = magnitude * 10.0 ** -exponent * 10.0 ** precision
+
+    # log10 can be off by one next to a power of ten
+    low = regular & (magnitude > 0) & (scaled < 10 ** precision)
+    exponent[low] -= 1
+    scaled[low] *= 10
+    high = scaled >= 10 ** (precision + 1)
+    exponent[high] += 1
+    scaled[high] /= 10
+
+    digits = np.rint(np.where(regular, scaled, 0.0)).astype(np.int64 if precision > 8 else np.int32)
+    carry = digits >= 10 ** (precision + 1)
+    digits[carry] //= 10
+    exponent[carry] += 1
+
+    # round-half cases depend on the exact binary value, leave them to the string formatter
+    with np.errstate(invalid='ignore'):
+        fallback = ~regular | (np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+
+    # unsigned layout d.ddddde+XX first, whole columns at a time
+    remaining = digits
+    for k in range(precision, 0, -1):
+        quotient = remaining // 10
+        out[:, k + 1] = ord('0') + (remaining - quotient * 10)
+        remaining = quotient
+    out[:, 0] = ord('0') + remaining
+    out[:, 1] = ord('.')
+    out[:, precision + 2] = ord('e')
+    out[:, precision + 3] = np.where(exponent < 0, ord('-'), ord('+'))
+    exponent = np.abs(exponent)
+    out[:, precision + 4] = ord('0') + (exponent // 10) % 10
+    out[:, precision + 5] = ord('0') + exponent % 10
+    wide = exponent >= 100
+    out[wide, precision + 4] = ord('0') + exponent[wide] // 100
+    out[wide, precision + 5] = ord('0') + (exponent[wide] // 10) % 10
+    out[wide, precision + 6] = ord('0') + exponent[wide] % 10
+
+    # negative values shift right by one behind the sign
+    negative = np.signbit(values)
+    out[negative, 1:] = out[negative, :-1]
+    out[negative, 0] = ord('-')
+
+    for idx in np.flatnonzero(fallback):
+        text = format(values[idx], f'<{width}.{precision}e')
+        out[idx] = np.frombuffer(text.encode('ascii').ljust(width), dtype=np.uint8)[:width]
+    return out
+
+
+def write_text_block(file, t_values, y_values, chunk_size=4096):
+    # byte-for-byte the rows f"{t:<15.4e}" + f"{p:<20.6e}" * N, formatted a chunk at a time
+    y_values = np.asarray(y_values, dtype=np.float64)
+    t_values = np.asarray(t_values, dtype=np.float64)
+    n_states = y_values.shape[0]
+    for start in range(0, t_values.size, chunk_size):
+        t_chunk = t_values[start:start + chunk_size]
+        y_chunk = y_values[:, start:start + chunk_size]
+        n = t_chunk.size
+        populations = format_scientific(y_chunk, 6, 20).reshape(n_states, n, 20).transpose(1, 0, 2).reshape(n, -1)
+        newline = np.full((n, 1), ord('\n'), dtype=np.uint8)
+        file.write(np.hstack((format_scientific(t_chunk, 4, 15), populations, newline)).tobytes().decode('ascii'))
+
+
+def write_kinetics_data(
+    data_path, state_names, t_excitation, y_excitation, t_decay, y_decay, divider_width=80, stride=None,
+    log_points=None
+):
+    header = f"{'Time (s)':<15}" + "".join(f"{state:<20}" for state in state_names) + "\n"
+    with open(data_path, "w", buffering=2 ** 20) as file:
+        for title, t_values, y_values in (("Excitation Kinetics:\n", t_excitation, y_excitation),
+                                          ("\nDecay Kinetics:\n", t_decay, y_decay)):
+            file.write(title)
+            file.write(header)
+            file.write("-" * divider_width + "\n")
+            keep = decimation_indices(t_values, stride=stride, log_points=log_points)
+            write_text_block(file, np.asarray(t_values)[keep], np.asarray(y_values)[:, keep])
+
+    print(f"Kinetics data successfully saved to {data_path}\n")
+
+
+def _kinetics_arrays(t_excitation, y_excitation, t_decay, y_decay):
+    # populations are stored state by state, so every state's time series is one contiguous column
+    return dict(zip(ARRAY_NAMES, (np.ascontiguousarray(a, dtype=RAW_DTYPE) for a in (t_excitation, y_excitation, t_decay, y_decay))))
+
+
+def write_kinetics_npz(data_path, state_names, t_excitation, y_excitation, t_decay, y_decay, compressed=True):
+    arrays = _kinetics_arrays(t_excitation, y_excitation, t_decay, y_decay)
+    save = np.savez_compressed if compressed else np.savez
+    with open(data_path, "wb") as file:
+        save(file, states=np.array(list(state_names)), **arrays)
+
+    print(f"Kinetics data successfully saved to {data_path}\n")
+
+
+def write_kinetics_raw(data_path, state_names, t_excitation, y_excitation, t_decay, y_decay):
+    # data_path is the JSON header; the arrays go back to back into the .bin file next to it
+    arrays = _kinetics_arrays(t_excitation, y_excitation, t_decay, y_decay)
+    binary_path = os.path.splitext(data_path)[0] + '.bin'
+
+    layout = {}
+    offset = 0
+    with open(binary_path, "wb") as file:
+        for name, array in arrays.items():
+            array.tofile(file)
+            layout[name] = {'offset': offset, 'shape': list(array.shape)}
+            offset += array.nbytes
+
+    header = {
+        'format': 'kinluv-raw',
+        'version': 1,
+        'dtype': RAW_DTYPE,
+        'data_file': os.path.basename(binary_path),
+        'states': list(state_names),
+        'arrays': layout,
+    }
+    with open(data_path, "w") as file:
+        json.dump(header, file, indent=2)
+
+    print(f"Kinetics data successfully saved to {data_path} and {binary_path}\n")
+
+
+def save_kinetics_data(
+    data_path, state_names, t_excitation, y_excitation, t_decay, y_decay, data_format='text', divider_width=80,
+    compressed=True, stride=None, log_points=None
+):
+    if data_format == 'text':
+        write_kinetics_data(
+            data_path, state_names, t_excitation, y_excitation, t_decay, y_decay, divider_width,
+            stride=stride, log_points=log_points
+        )
+        return
+
+    if stride or log_points:
+        keep = decimation_indices(t_excitation, stride=stride, log_points=log_points)
+        t_excitation, y_excitation = np.asarray(t_excitation)[keep], np.asarray(y_excitation)[:, keep]
+        keep = decimation_indices(t_decay, stride=stride, log_points=log_points)
+        t_decay, y_decay = np.asarray(t_decay)[keep], np.asarray(y_decay)[:, keep]
+
+    if data_format == 'npz':
+        write_kinetics_npz(data_path, state_names, t_excitation, y_excitation, t_decay, y_decay, compressed=compressed)
+    elif data_format == 'raw':
+        write_kinetics_raw(data_path, state_names, t_excitation, y_excitation, t_decay, y_decay)
+    else:
+        raise ValueError(f"Unknown data format '{data_format}', choose one of {DATA_FORMATS}.")
+
+
+def read_kinetics_text(data_path):
+    with open(data_path) as file:
+        lines = file.read().splitlines()
+
+    sections = {}
+    states = []
+    for title, name in (("Excitation Kinetics:", 'excitation'), ("Decay Kinetics:", 'decay')):
+        start = lines.index(title)
+        states = lines[start + 1].split()[2:]
+        stop = start + 3
+        while stop < len(lines) and lines[stop].strip():
+            stop += 1
+        table = np.loadtxt(lines[start + 3:stop], ndmin=2)
+        sections['t_' + name] = table[:, 0]
+        sections['y_' + name] = np.ascontiguousarray(table[:, 1:].T)
+
+    sections['states'] = states
+    return sections
+
+
+def load_kinetics_data(data_path, mmap=True):
+    # {'states', 't_excitation', 'y_excitation', 't_decay', 'y_decay'} from any of the formats;
+    # raw arrays are memory-mapped read-only unless mmap=False
+    extension = os.path.splitext(data_path)[1]
+    if extension == DATA_EXTENSIONS['npz']:
+        with np.load(data_path) as archive:
+            data = {name: archive[name] for name in ARRAY_NAMES}
+            data['states'] = [str(state) for state in archive['states']]
+        return data
+
+    if extension == DATA_EXTENSIONS['raw']:
+        with open(data_path) as file:
+            header = json.load(file)
+        binary_path = os.path.join(os.path.dirname(data_path), header['data_file'])
+        data = {'states': header['states']}
+        for name, entry in header['arrays'].items():
+            shape = tuple(entry['shape'])
+            if mmap:
+                data[name] = np.memmap(binary_path, dtype=header['dtype'], mode='r', offset=entry['offset'], shape=shape)
+            else:
+                count = int(np.prod(shape))
+                data[name] = np.fromfile(binary_path, dtype=header['dtype'], count=count, offset=entry['offset']).reshape(shape)
+        return data
+
+    return read_kinetics_text(data_path)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+import os
+import csv
+import itertools
+import traceback
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from kinetics.model import MODELS
+from kinetics.cache import excitation_cache, excitation_key
+from kinetics.lifetimes import emission_lifetimes
+from kinetics.propagator import MatrixExponentialPropagator
+from kinetics.yields import quantum_yields
+
+
+def parameter_grid(base, ranges):
+    # cartesian product of the listed values, every other parameter is taken from base
+    names = list(ranges)
+    grid = []
+    for values in itertools.product(*(np.atleast_1d(ranges[name]) for name in names)):
+        params = dict(base)
+        params.update({name: float(value) for name, value in zip(names, values)})
+        grid.append(params)
+    return grid
+
+
+def read_parameter_table(csv_path, base=None):
+    # one parameter set per row, missing columns fall back to base
+    parameter_sets = []
+    with open(csv_path, newline='') as file:
+        for line, row in enumerate(csv.DictReader(file), start=2):
+            params = dict(base or {})
+            for key, value in row.items():
+                if not key or value in (None, ''):
+                    continue
+                try:
+                    params[key.strip()] = float(value)
+                except ValueError:
+                    raise ValueError(f"{csv_path}, line {line}: '{key.strip()}' is not a number ({value!r}).")
+            parameter_sets.append(params)
+    return parameter_sets
+
+
+def evaluate_parameters(model, params):
+    rate_constants = {name: float(params[name]) for name in model.rate_names}
+    y0 = model.initial_populations(params['num_photon'])
+
+    def compute():
+        propagator = MatrixExponentialPropagator(model.rate_matrix(rate_constants, excitation=True))
+        return propagator.propagate(y0, params['time_pulse'])
+
+    # parameter sets that share the excitation phase propagate the pulse once per worker
+    key = excitation_key(model, rate_constants, params['time_pulse'], params['num_photon'], engine='expm')
+    pulse_end = np.array(excitation_cache.get_or_compute(key, compute))
+
+    lifetimes = emission_lifetimes(model, rate_constants, pulse_end)
+    result = {
+        'PLQY': quantum_yields(model, rate_constants)['QY_fl'],
+        'tau_prompt': float(lifetimes[0]) if lifetimes.size else np.nan,
+        'tau_delayed': float(lifetimes[-1]) if lifetimes.size > 1 else np.nan,
+    }
+    result.update({f"{state}_pulse_end": float(value) for state, value in zip(model.states, pulse_end)})
+    return result
+
+
+def _run_task(task):
+    index, model, params = task
+    row = {'index': index}
+    row.update(params)
+    try:
+        row.update(evaluate_parameters(model, params))
+        row['error'] = ''
+    except Exception as e:
+        # one bad parameter set must not take down the rest of the sweep
+        row['error'] = f"{type(e).__name__}: {e}"
+        row['traceback'] = traceback.format_exc()
+    return row
+
+
+def run_sweep(model, parameter_sets, workers=None, chunksize=None):
+    if isinstance(model, int):
+        model = MODELS[model]
+
+    tasks = [(index, model, params) for index, params in enumerate(parameter_sets)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(tasks) <= 1:
+        return [_run_task(task) for task in tasks]
+
+    if chunksize is None:
+        # a few chunks per worker keeps every core busy without drowning in pickling overhead
+        chunksize = max(1, len(tasks) // (workers * 4))
+
+    # map keeps the results in the order of the parameter sets
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_run_task, tasks, chunksize=chunksize))
+
+
+def write_sweep_table(results, csv_path):
+    columns = []
+    for row in results:
+        for key in row:
+            if key not in columns and key != 'traceback':
+                columns.append(key)
+
+    with open(csv_path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+
+    print(f"Sweep results successfully saved to {csv_path}\n")
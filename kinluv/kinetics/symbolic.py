@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import hashlib
+import itertools
+import numpy as np
+
+# sympy is imported inside the functions that need it, so numeric runs never load it
+
+# bump whenever the layout of the cached solutions or the solution method changes
+CACHE_VERSION = 2
+
+_loaded_solutions = {}
+
+
+def _lambdify(args, expressions):
+    import sympy as sp
+
+    # common-subexpression elimination needs sympy >= 1.9
+    try:
+        return sp.lambdify(args, expressions, modules='numpy', cse=True)
+    except TypeError:
+        return sp.lambdify(args, expressions, modules='numpy')
+
+
+def compile_expressions(expressions, t):
+    import sympy as sp
+
+    # compile the population expressions of all states into one numpy callable; dsolve leaves products
+    # like (a + b*exp(k*t))*exp(-k*t) whose factors overflow long before the product does, so the
+    # exponentials are combined first
+    func = _lambdify(t, [sp.powsimp(sp.expand(expr)) for expr in expressions])
+
+    def evaluate(t_values):
+        t_values = np.asarray(t_values, dtype=np.float64)
+        values = func(t_values)
+        return np.array([np.real(np.broadcast_to(value, t_values.shape)) for value in values], dtype=np.float64)
+
+    return evaluate
+
+
+def _eigenvalues(A):
+    import sympy as sp
+
+    # rate matrices conserve the total population, so one eigenvalue is zero
+    lam = sp.Dummy('lam')
+    coeffs = sp.Poly((A - lam * sp.eye(A.shape[0])).det(), lam).all_coeffs()
+    if sp.simplify(coeffs[-1]) != 0:
+        raise ValueError("The rate matrix has no zero eigenvalue.")
+
+    # monic polynomial whose roots are the non-zero eigenvalues
+    reduced = [c / coeffs[0] for c in coeffs[:-1]]
+    if len(reduced) == 2:
+        return [sp.S.Zero, -reduced[1]], reduced
+    if len(reduced) == 3:
+        # numerically stable roots of lam**2 + b*lam + c, the slow root is c / fast
+        b, c = reduced[1], reduced[2]
+        fast = -(b + sp.sqrt(b ** 2 - 4 * c)) / 2
+        return [sp.S.Zero, fast, c / fast], reduced
+    raise NotImplementedError("Closed-form solutions are only available for two- and three-state models.")
+
+
+def solve_linear_system(A, P0):
+    # P(t) = sum_i exp(lam_i t) Z_i P0 with the spectral projectors Z_i of A
+    import sympy as sp
+
+    eigenvalues, reduced = _eigenvalues(A)
+    n = A.shape[0]
+    identity = sp.eye(n)
+
+    # the zero mode written as q(A) / q(0) has no square roots and cancels exactly,
+    # which keeps the long-time limits free of round-off
+    Z0 = sp.zeros(n)
+    for m, c in enumerate(reduced):
+        Z0 += c * A ** (len(reduced) - 1 - m)
+    Z0 = (Z0 / reduced[-1]).applyfunc(sp.cancel)
+    projectors = [Z0]
+
+    if n == 2:
+        projectors.append(identity - Z0)
+    else:
+        # from A = lam_f Z_f + lam_s Z_s and Z_0 + Z_f + Z_s = I; unlike the product form of
+        # Sylvester's formula this avoids cancelling terms of order |A|**2 in the slow mode
+        lam_f, lam_s = eigenvalues[1], eigenvalues[2]
+        Zs = (A - lam_f * (identity - Z0)) / (lam_s - lam_f)
+        projectors.extend([identity - Z0 - Zs, Zs])
+
+    coefficients = [list(Z * P0) for Z in projectors]
+    return eigenvalues, coefficients
+
+
+def _parse_srepr(text):
+    import ast
+    import sympy as sp
+
+    # cached expressions are read back only as nested calls of sympy classes with literal arguments,
+    # anything else in the file is refused before sympify evaluates it
+    literals = tuple(getattr(ast, name) for name in ('Constant', 'Num', 'Str') if hasattr(ast, name))
+    allowed = (ast.Expression, ast.Call, ast.Name, ast.Load, ast.keyword, ast.UnaryOp, ast.USub, ast.Tuple, ast.List) + literals
+    for node in ast.walk(ast.parse(text, mode='eval')):
+        if not isinstance(node, allowed):
+            raise ValueError(f"Unexpected {type(node).__name__} in a cached expression.")
+        if isinstance(node, ast.Name):
+            target = getattr(sp, node.id, None) if not node.id.startswith('_') else None
+            if not (isinstance(target, type) and issubclass(target, sp.Basic)):
+                raise ValueError(f"Unexpected name '{node.id}' in a cached expression.")
+    return sp.sympify(text)
+
+
+class ParametricSolution:
+    # P_k(t) = sum_i C[i][k] exp(lam_i t), with lam_i and C compiled as functions of the parameters
+    def __init__(self, parameters, eigenvalues, coefficients):
+        self.parameter_names = [p.name for p in parameters]
+        self.eigenvalues = list(eigenvalues)
+        self.coefficients = [list(row) for row in coefficients]
+        self._func = _lambdify(list(parameters), self.eigenvalues + [c for row in self.coefficients for c in row])
+
+    @classmethod
+    def from_cache(cls, parameters, data):
+        # srepr keeps the assumptions, so the rebuilt symbols are the caller's parameters
+        if data['parameters'] != [p.name for p in parameters]:
+            raise ValueError("The cached solution belongs to other parameters.")
+        eigenvalues = [_parse_srepr(text) for text in data['eigenvalues']]
+        coefficients = [[_parse_srepr(text) for text in row] for row in data['coefficients']]
+        return cls(parameters, eigenvalues, coefficients)
+
+    def to_cache(self):
+        import sympy as sp
+
+        return {
+            'parameters': self.parameter_names,
+            'eigenvalues': [sp.srepr(e) for e in self.eigenvalues],
+            'coefficients': [[sp.srepr(c) for c in row] for row in self.coefficients],
+        }
+
+    def modes(self, values):
+        n = len(self.eigenvalues)
+        with np.errstate(all='ignore'):
+            flat = self._func(*[values[name] for name in self.parameter_names])
+        return flat[:n], [flat[n + i * n:n + (i + 1) * n] for i in range(n)]
+
+    def is_valid_for(self, values, gap_tol=1e-6):
+        # repeated or complex eigenvalues need the general (Jordan) solution
+        eigenvalues, coefficients = self.modes(values)
+        eigenvalues = np.array(eigenvalues, dtype=np.float64)
+        if not np.all(np.isfinite(eigenvalues)) or not np.all(np.isfinite(np.array(coefficients, dtype=np.float64))):
+            return False
+        for lam_i, lam_j in itertools.combinations(eigenvalues, 2):
+            if abs(lam_i - lam_j) <= gap_tol * max(abs(lam_i), abs(lam_j)):
+                return False
+        return True
+
+    def evaluate(self, values, t_values):
+        # parameter arrays broadcast against t, e.g. (B, 1) rate constants with a (T,) time grid
+        t_values = np.asarray(t_values, dtype=np.float64)
+        eigenvalues, coefficients = self.modes(values)
+        decays = [np.exp(np.multiply(lam, t_values)) for lam in eigenvalues]
+        populations = [
+            sum(coefficients[i][k] * decays[i] for i in range(len(eigenvalues)))
+            for k in range(len(eigenvalues))
+        ]
+        return np.array(np.broadcast_arrays(*populations), dtype=np.float64)
+
+    def limits_at(self, values):
+        # the zero eigenvalue comes first, every other mode has decayed at t -> infinity
+        _, coefficients = self.modes(values)
+        return [float(c) for c in coefficients[0]]
+
+    def substitute(self, values, t):
+        import sympy as sp
+
+        eigenvalues, coefficients = self.modes(values)
+        expressions = []
+        for k in range(len(eigenvalues)):
+            expr = sp.S.Zero
+            for i, lam in enumerate(eigenvalues):
+                if coefficients[i][k] != 0:
+                    expr += sp.Float(coefficients[i][k]) * sp.exp(sp.Float(lam) * t)
+            expressions.append(expr)
+        return expressions
+
+
+def get_cache_dir():
+    return os.environ.get('KINLUV_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'kinluv'))
+
+
+def load_parametric_solution(model, A, P0, parameters):
+    import sympy as sp
+
+    # the fingerprint covers the equations themselves, so editing a model invalidates its cache
+    fingerprint = hashlib.sha256(
+        "|".join([str(CACHE_VERSION), sp.__version__, sp.srepr(A), sp.srepr(P0), sp.srepr(list(parameters))]).encode('utf-8')
+    ).hexdigest()[:16]
+
+    if fingerprint in _loaded_solutions:
+        return _loaded_solutions[fingerprint]
+
+    cache_dir = get_cache_dir()
+    cache_path = os.path.join(cache_dir, f"{model}-v{CACHE_VERSION}-{fingerprint}.json")
+    solution = None
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                solution = ParametricSolution.from_cache(parameters, json.load(f))
+        except (OSError, ValueError, KeyError, TypeError, SyntaxError, sp.SympifyError):
+            solution = None
+
+    if solution is None:
+        eigenvalues, coefficients = solve_linear_system(A, P0)
+        solution = ParametricSolution(parameters, eigenvalues, coefficients)
+        _write_cache(cache_dir, cache_path, dict(
+            model=model, version=CACHE_VERSION, fingerprint=fingerprint, **solution.to_cache()
+        ))
+
+    _loaded_solutions[fingerprint] = solution
+    return solution
+
+
+def _write_cache(cache_dir, cache_path, data):
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # a read-only cache location only costs the symbolic solve on the next run
+        pass
+
+
+def clear_cache(model=None):
+    # other versions and other models may still be in use by other installs, so cleaning up is explicit
+    cache_dir = get_cache_dir()
+    removed = []
+    if not os.path.isdir(cache_dir):
+        return removed
+    prefix = f"{model}-v" if model else ''
+    for name in sorted(os.listdir(cache_dir)):
+        if name.startswith(prefix) and name.endswith('.json'):
+            os.remove(os.path.join(cache_dir, name))
+            removed.append(name)
+    _loaded_solutions.clear()
+    return removed
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from scipy.linalg import expm
+from scipy.sparse.linalg import spsolve
+from colorama import Fore
+
+# channels that return an excited molecule to the ground state
+YIELD_PROCESSES = ('FL', 'IC', 'ISC', 'PH')
+
+
+def is_batch(rate_constants):
+    return not isinstance(rate_constants, dict) or np.ndim(next(iter(rate_constants.values()))) > 0
+
+
+def _excited_indices(model):
+    ground = model.index(model.ground_state)
+    return np.array([idx for idx in range(model.n_states) if idx != ground], dtype=np.intp)
+
+
+def _absorbed_distribution(model, rates):
+    # where one absorbed photon lands, weighted by the absorption rates into each state
+    P0 = np.zeros((rates.shape[0], model.n_states))
+    for m, transition in enumerate(model.transitions):
+        if transition.is_excitation and transition.source == model.ground_state:
+            P0[:, model.index(transition.target)] += rates[:, m]
+    total = P0.sum(axis=1, keepdims=True)
+    if np.any(total <= 0):
+        raise ValueError(f"The {model.name} model needs a positive absorption rate out of {model.ground_state}.")
+    return P0 / total
+
+
+def integrated_populations(model, rate_constants, sparse=None):
+    # time-integrated populations per absorbed photon, tau = -A_EE^-1 @ P0_E on the excited
+    # states, where the ground state acts as the absorbing state of the decay chain
+    batched = is_batch(rate_constants)
+    rates = model.rate_array(rate_constants)
+    P0 = _absorbed_distribution(model, rates)
+    excited = _excited_indices(model)
+
+    tau = np.zeros((rates.shape[0], model.n_states))
+    if model.use_sparse(sparse) and not batched:
+        A = model.sparse_rate_matrix(rate_constants, excitation=False).tocsc()[excited][:, excited]
+        tau[0, excited] = spsolve(-A.tocsc(), P0[0, excited])
+    else:
+        A = model.rate_matrices(rate_constants, excitation=False)[:, excited][:, :, excited]
+        tau[:, excited] = np.linalg.solve(-A, P0[:, excited, None])[..., 0]
+    return tau if batched else tau[0]
+
+
+def process_yields(model, rate_constants, sparse=None):
+    # fraction of absorbed photons leaving through each ground-state return channel, so the
+    # yields sum to one; floats for one rate set, arrays of length B for a batch
+    rates = model.rate_array(rate_constants)
+    tau = np.atleast_2d(integrated_populations(model, rate_constants, sparse=sparse))
+
+    yields = {process: np.zeros(rates.shape[0]) for process in YIELD_PROCESSES}
+    for m, transition in enumerate(model.transitions):
+        if transition.target == model.ground_state and not transition.is_excitation:
+            flux = rates[:, m] * tau[:, model.index(transition.source)]
+            yields[transition.process] = yields.get(transition.process, 0.0) + flux
+
+    if is_batch(rate_constants):
+        return yields
+    return {process: float(value[0]) for process, value in yields.items()}
+
+
+def _emission_weights(model, rates, processes):
+    # (B, N) radiative rate out of every state
+    weights = np.zeros((rates.shape[0], model.n_states))
+    for m, transition in enumerate(model.transitions):
+        if transition.process in processes:
+            weights[:, model.index(transition.source)] += rates[:, m]
+    return weights
+
+
+def _prompt_mask(model, prompt_states):
+    # transitions that carry population back into the emissive manifold, e.g. RISC T1->S1
+    excited = set(model.states) - {model.ground_state}
+    return np.array([
+        t.source in excited - prompt_states and t.target in prompt_states
+        for t in model.transitions
+    ], dtype=bool)
+
+
+def emission_yields(model, rate_constants, processes=('FL',), prompt_states=None):
+    # PLQY split into prompt emission (never left the emissive manifold) and delayed emission
+    # (returned to it at least once); PF is the yield of the chain with those returns removed
+    if prompt_states is None:
+        # same spin manifold as the emissive state, e.g. S1 and S2 for S1 emission
+        prompt_states = {state for state in model.states if state[0] == model.emissive_state[0]}
+    prompt_states = set(prompt_states) - {model.ground_state}
+
+    P0 = _absorbed_distribution(model, model.rate_array(rate_constants))
+    rates = model.rate_array(rate_constants, excitation=False)
+    weights = _emission_weights(model, rates, processes)
+    excited = _excited_indices(model)
+
+    prompt_rates = rates.copy()
+    prompt_rates[:, _prompt_mask(model, prompt_states)] = 0.0
+    yields = {}
+    for key, r in (('PLQY', rates), ('PF', prompt_rates)):
+        A = model.assemble(r)[:, excited][:, :, excited]
+        tau = np.linalg.solve(-A, P0[:, excited, None])[..., 0]
+        yields[key] = np.einsum('bi,bi->b', weights[:, excited], tau)
+    yields['DF'] = yields['PLQY'] - yields['PF']
+
+    if is_batch(rate_constants):
+        return yields
+    return {key: float(value[0]) for key, value in yields.items()}
+
+
+def _van_loan_integral(A, P0, t):
+    # the last column of expm([[A, P0], [0, 0]] t) is int_0^t expm(A s) @ P0 ds, also for singular A
+    n = A.shape[0]
+    M = np.zeros((n + 1, n + 1))
+    M[:n, :n] = A
+    M[:n, n] = P0
+    return expm(M * t)[:n, n]
+
+
+def gated_emission(model, rate_constants, gates, y0=None, processes=('FL',), cond_limit=1e8):
+    # integrated emission per absorbed photon (or from y0) inside each (start, stop) time gate,
+    # int_a^b w . P(t) dt with the excited block A_EE: A_EE^-1 (expm(A_EE b) - expm(A_EE a)) P0
+    gates = np.atleast_2d(np.asarray(gates, dtype=np.float64))
+    rates = model.rate_array(rate_constants, excitation=False)
+    if y0 is None:
+        P0 = _absorbed_distribution(model, model.rate_array(rate_constants))
+    else:
+        P0 = np.broadcast_to(np.asarray(y0, dtype=np.float64), (rates.shape[0], model.n_states))
+    weights = _emission_weights(model, rates, processes)
+    excited = _excited_indices(model)
+    A = model.assemble(rates)[:, excited][:, :, excited]
+    P0 = P0[:, excited]
+    w = weights[:, excited]
+
+    emission = np.empty((rates.shape[0], gates.shape[0]))
+    eigenvalues, eigenvectors = np.linalg.eig(A)
+    with np.errstate(all='ignore'):
+        cond = np.linalg.cond(eigenvectors)
+    good = np.isfinite(cond) & (cond < cond_limit)
+
+    if np.any(good):
+        V = eigenvectors[good]
+        lam = eigenvalues[good]
+        coeffs = np.linalg.solve(V, P0[good][..., None].astype(V.dtype))[..., 0]
+        projections = np.einsum('bi,bij->bj', w[good].astype(V.dtype), V) * coeffs
+        start = gates[:, 0][None, None, :]
+        width = (gates[:, 1] - gates[:, 0])[None, None, :]
+        # exp(lam a) * expm1(lam (b - a)) / lam keeps short gates accurate
+        with np.errstate(over='ignore', invalid='ignore'):
+            factors = np.exp(lam[:, :, None] * start) * np.expm1(lam[:, :, None] * width) / lam[:, :, None]
+        factors = np.where(np.isinf(gates[:, 1])[None, None, :], -np.exp(lam[:, :, None] * start) / lam[:, :, None], factors)
+        emission[good] = np.einsum('bj,bjg->bg', projections, factors).real
+
+    for idx in np.flatnonzero(~good):
+        for g, (t_start, t_stop) in enumerate(gates):
+            stop = _van_loan_integral(A[idx], P0[idx], t_stop) if np.isfinite(t_stop) else -np.linalg.solve(A[idx], P0[idx])
+            emission[idx, g] = w[idx] @ (stop - _van_loan_integral(A[idx], P0[idx], t_start))
+
+    if is_batch(rate_constants):
+        return emission
+    return emission[0]
+
+
+def yield_table(model, rate_constants, populations):
+    # every excited molecule eventually returns to the ground state through one of these channels
+    def flux(transitions):
+        return sum(rate_constants[t.rate_name] * populations[t.source] for t in transitions)
+
+    relaxation = [t for t in model.transitions if t.target == model.ground_state and not t.is_excitation]
+    total = flux(relaxation)
+
+    radiative = [t for t in model.transitions if t.process == 'FL']
+    yields = {'QY_fl': flux(radiative) / total * 100}
+    for transition in model.transitions_for(source=model.emissive_state):
+        label = f"QY_{transition.process.lower()}_{transition.source.lower()}{transition.target.lower()}"
+        yields[label] = flux([transition]) / total * 100
+    return yields
+
+
+def quantum_yields(model, rate_constants, sparse=None):
+    # numeric yields in percent, without any console output
+    populations = dict(zip(model.states, integrated_populations(model, rate_constants, sparse=sparse)))
+    return {key: float(value) for key, value in yield_table(model, rate_constants, populations).items()}
+
+
+class QuantumYieldCalculator:
+    # subclasses bind a KineticModel here, or pass one explicitly with model=
+    model = None
+
+    def __init__(self, rate_constants, model=None, sparse=None, symbolic=False):
+        if model is not None:
+            self.model = model
+        if self.model is None:
+            raise ValueError("No kinetic model given.")
+        self.rate_constants = rate_constants
+        self.sparse = sparse
+        self.symbolic = symbolic
+        self.quantum_yields = {}
+        self.process_yields = {}
+
+        # the symbolic steady-state balance dP/dt = A @ P = 0 is only built on request,
+        # to print the populations as expressions of S1
+        self.state_symbols = None
+        self.equations = None
+        if symbolic:
+            import sympy as sp
+
+            self.state_symbols = sp.symbols(list(self.model.states))
+            A = sp.Matrix(self.model.rate_matrix(rate_constants, excitation=True))
+            self.equations = list(A * sp.Matrix(self.state_symbols))
+
+    def _symbolic_populations(self):
+        import sympy as sp
+
+        emissive = self.state_symbols[self.model.index(self.model.emissive_state)]
+        others = [symbol for symbol in self.state_symbols if symbol != emissive]
+        solution = sp.solve(self.equations, others + [emissive])
+
+        # output solutions with S1
+        print(Fore.YELLOW + f"\n Expressions of different state population with {emissive}: ")
+        for symbol in others:
+            print(f" {symbol} = ", solution[symbol])
+
+        return {state: solution.get(symbol, symbol) for state, symbol in zip(self.model.states, self.state_symbols)}
+
+    def _numeric_populations(self):
+        return dict(zip(self.model.states, integrated_populations(self.model, self.rate_constants, sparse=self.sparse)))
+
+    def calculate_quantum_yield(self):
+        populations = self._symbolic_populations() if self.symbolic else self._numeric_populations()
+        self.quantum_yields = {key: float(value) for key, value in yield_table(self.model, self.rate_constants, populations).items()}
+        self.process_yields = process_yields(self.model, self.rate_constants, sparse=self.sparse)
+
+        QY_fl = self.quantum_yields['QY_fl']
+        print(Fore.YELLOW + "\n Quantum Yield of Fluorescence (%): ")
+        print(f" {QY_fl:.2f}% \n")
+        return QY_fl
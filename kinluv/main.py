@@ -1,11 +1,25 @@
 # -*- coding: utf-8 -*-
 
 import os
+import glob
+import time
+import argparse
 import importlib
 import sys
 import inspect
+from concurrent.futures import ProcessPoolExecutor
 from colorama import Fore, Style, init
 from art import text2art
+from kinetics.logs import LOG_FORMATS, LOG_LEVELS
+from kinetics.grids import GRIDS
+from kinetics.pipeline import DECAY_FITS, EXCITATION_MODES
+from kinetics.plotting import FIGURE_FORMATS
+from kinetics.profiling import PROFILERS, flatten_profile
+from kinetics.propagator import ENGINES
+from kinetics.solvers import TOLERANCE_PRESETS
+from kinetics.storage import DATA_FORMATS
+from kinetics.sweep import write_sweep_table
+from kinetics.symbolic import clear_cache, get_cache_dir
 
 init(autoreset=True)
 author_info = """
@@ -19,6 +33,10 @@ sys.path.append(os.path.join(os.getcwd(), 'states3'))
 sys.path.append(os.path.join(os.getcwd(), 'states4'))
 sys.path.append(os.path.join(os.getcwd(), 'states5'))
 
+MODULES = {2: 'states2', 3: 'states3', 4: 'states4', 5: 'states5'}
+# options an input file may give as words, every other parameter has to be a number
+STRING_PARAMS = ('engine', 'tolerance', 'grid', 'excitation_mode', 'decay_fit', 'data_format', 'plot_format', 'log_level', 'log_format')
+
 
 def print_kinluv_logo():
     ascii_art = text2art("KinLuv", font="ogre")
@@ -33,6 +51,11 @@ def print_kinluv_logo():
             colored_art += char  
     print(colored_art)
 
+def filter_params(func, params):
+    # an input file may hold the rate constants of every model, each module takes its own
+    valid_keys = inspect.signature(func).parameters.keys()
+    return {k: v for k, v in params.items() if k in valid_keys}
+
 def run_module(module_name, params=None):
     try:
         module = importlib.import_module(module_name)
@@ -43,10 +66,7 @@ def run_module(module_name, params=None):
             main_func = module.main
 
             if params:
-                sig = inspect.signature(main_func)
-                valid_keys = sig.parameters.keys()
-                filtered_params = {k: v for k, v in params.items() if k in valid_keys}
-                main_func(**filtered_params)
+                main_func(**filter_params(main_func, params))
             else:
                 main_func()
         else:
@@ -213,6 +233,9 @@ def read_params_from_inp(filepath):
                 key, value = line.split("=", 1)
                 key = key.strip()
                 value = value.strip().rstrip(',') 
+                if key in STRING_PARAMS:
+                    params[key] = value.strip('\'"')
+                    continue
                 try:
                     value = float(value)
                 except ValueError:
@@ -230,7 +253,141 @@ def get_params_from_inp():
         print(Fore.RED + f"Error reading input file: {e}")
         sys.exit(1)
 
-def main():
+def expand_inputs(patterns):
+    # glob patterns are expanded here as well, so quoted patterns work on every shell
+    paths = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+def output_folders(paths, output_dir):
+    # one results folder per input, named after the file and numbered when two inputs share a name
+    folders = []
+    counts = {}
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0] or 'run'
+        counts[stem] = counts.get(stem, 0) + 1
+        name = stem if counts[stem] == 1 else f"{stem}_{counts[stem]}"
+        folders.append(os.path.join(output_dir, name))
+    return folders
+
+def run_input(task):
+    module_name, input_path, results_folder, options = task
+    start = time.perf_counter()
+    row = {'input': input_path, 'results_folder': results_folder, 'error': '', 'PLQY': None}
+    try:
+        params = read_params_from_inp(input_path)
+        params.update(options)
+        params['results_folder'] = results_folder
+        module = importlib.import_module(module_name)
+        result = module.main(**filter_params(module.main, params))
+        # the result itself holds the arrays, only the scalars travel back from a worker
+        row['PLQY'] = result.plqy
+        row.update(flatten_profile(result.profile or {}))
+    except Exception as e:
+        # one bad input must not take down the rest of the batch
+        row['error'] = f"{type(e).__name__}: {e}"
+    row['time'] = time.perf_counter() - start
+    return row
+
+def run_batch(model, patterns, output_dir=None, workers=1, **options):
+    # every input runs in this process (or in a small pool), so the interpreter, the imports and
+    # the excitation cache are paid for once instead of once per input
+    module_name = MODULES[model]
+    paths = expand_inputs(patterns)
+    folders = output_folders(paths, output_dir or f"results_{model}states")
+    tasks = [(module_name, path, folder, options) for path, folder in zip(paths, folders)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(tasks) <= 1:
+        return [run_input(task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        return list(executor.map(run_input, tasks))
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='kinluv', description="Multistate kinetics of TADF emitters. Without arguments KinLuv starts the interactive mode.")
+    subparsers = parser.add_subparsers(dest='command')
+
+    run = subparsers.add_parser('run', help="run one model for every input file")
+    run.add_argument('inputs', nargs='+', help="*.inp files or glob patterns")
+    run.add_argument('--model', type=int, choices=sorted(MODULES), required=True, help="number of states")
+    run.add_argument('--output-dir', default=None, help="parent of the per-input results folders (default: results_<N>states)")
+    run.add_argument('--workers', type=int, default=1, help="inputs run in parallel, 0 uses every core")
+    run.add_argument('--engine', choices=ENGINES, default=None)
+    run.add_argument('--tolerance', choices=tuple(TOLERANCE_PRESETS), default=None, help="solver accuracy preset (default: default)")
+    run.add_argument('--rtol', type=float, default=None, help="relative tolerance of both solvers, overrides the preset")
+    run.add_argument('--atol', type=float, default=None, help="absolute tolerance of both solvers, overrides the preset")
+    run.add_argument('--excitation-max-step', type=float, default=None)
+    run.add_argument('--decay-max-step', type=float, default=None)
+    run.add_argument('--grid', choices=GRIDS, default=None, help="evaluation and export time grid (default: fixed)")
+    run.add_argument('--grid-points', type=int, default=None, help="point budget of each phase for the timescales and adaptive grids")
+    run.add_argument('--grid-tol', type=float, default=None, help="interpolation error target of the adaptive grid")
+    run.add_argument('--excitation-mode', choices=EXCITATION_MODES, default=None, help="solve the whole excitation window or only the pulse (default: window)")
+    run.add_argument('--error-estimate', action='store_true', help="check the radau and krylov solutions against the matrix exponential (expm is exact and not checked)")
+    run.add_argument('--decay-fit', choices=[fit for fit in DECAY_FITS if fit], default=None)
+    run.add_argument('--data-format', choices=DATA_FORMATS, default=None)
+    run.add_argument('--plot-format', choices=FIGURE_FORMATS, default=None)
+    run.add_argument('--no-plot', action='store_true', help="write the data files only")
+    run.add_argument('--log-level', choices=tuple(LOG_LEVELS), default=None)
+    run.add_argument('--log-format', choices=LOG_FORMATS, default=None)
+    run.add_argument('--quiet', action='store_true', help="no population dumps, only warnings on the console")
+    run.add_argument('--profile', action='append', choices=PROFILERS, default=None, help="also run cProfile or trace the peak memory, may be repeated")
+    run.add_argument('--profile-table', default=None, help="CSV file with the stage times and solver counters of every input")
+
+    clear = subparsers.add_parser('clear-cache', help="remove the cached closed-form solutions")
+    clear.add_argument('--model', default=None, help="only the solutions of this solver, e.g. s3decay")
+    return parser
+
+def run_cli(argv):
+    args = build_parser().parse_args(argv)
+    if args.command == 'clear-cache':
+        removed = clear_cache(args.model)
+        print(f"Removed {len(removed)} cached solutions from {get_cache_dir()}")
+        return 0
+    if args.command != 'run':
+        build_parser().print_help()
+        return 2
+
+    # only the options given on the command line override the input files and the defaults
+    options = {
+        key: value for key, value in (
+            ('engine', args.engine), ('tolerance', args.tolerance), ('rtol', args.rtol), ('atol', args.atol),
+            ('excitation_max_step', args.excitation_max_step), ('decay_max_step', args.decay_max_step), ('grid', args.grid),
+            ('grid_points', args.grid_points), ('grid_tol', args.grid_tol), ('excitation_mode', args.excitation_mode), ('decay_fit', args.decay_fit), ('data_format', args.data_format),
+            ('plot_format', args.plot_format), ('log_level', args.log_level), ('log_format', args.log_format),
+        ) if value is not None
+    }
+    if args.no_plot:
+        options['plot'] = False
+    if args.quiet:
+        options['quiet'] = True
+    if args.error_estimate:
+        options['error_estimate'] = True
+    if args.profile:
+        options['profile'] = tuple(args.profile)
+
+    start = time.perf_counter()
+    rows = run_batch(args.model, args.inputs, output_dir=args.output_dir, workers=args.workers, **options)
+
+    failed = [row for row in rows if row['error']]
+    for row in rows:
+        if row['error']:
+            print(Fore.RED + f"{row['input']}: {row['error']}")
+        else:
+            print(Fore.GREEN + f"{row['input']} -> {row['results_folder']} (PLQY {row['PLQY']:.2f}%, {row['time']:.2f} s)")
+    if args.profile_table:
+        write_sweep_table(rows, args.profile_table)
+    print(f"\n{len(rows) - len(failed)} of {len(rows)} inputs finished in {time.perf_counter() - start:.2f} s")
+    return 1 if failed else 0
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        return run_cli(argv)
+
     print_kinluv_logo()
     print(author_info)
     print(Fore.CYAN + "\nWelcome to KinLuv!\n")
@@ -273,5 +430,5 @@ def main():
         print(Fore.RED + "Invalid module choice. Please choose a, b, c, or d.")
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
 
@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 
 import sympy as sp
-from colorama import init, Fore, Style
+from colorama import Fore, Style
+from kinetics.model import TWO_STATE_MODEL
+from kinetics.symbolic import compile_expressions, load_parametric_solution
 from .s2excitation_solver import s2ExcitationSolver 
 
-init(autoreset=True)
-
 class s2DecaySolver:
+    parameter_names = ('k_fls1s0', 'k_ics1s0', 'S0_initial', 'S1_initial')
+
     def __init__(self, k_abss0s1=None, k_fls1s0=None, k_ics1s0=None, time_pulse=None, num_photon=None):
 
         self.t = sp.symbols('t')
@@ -27,12 +29,21 @@ class s2DecaySolver:
         self.S1_sol = None
         self.S0_limit = None
         self.S1_limit = None
+        self.solution_func = None
+        self._limits = None
 
     def _build_ode_equations(self):
         eq1 = sp.Eq(self.S0.diff(self.t), (self.k_fls1s0 + self.k_ics1s0) * self.S1)
         eq2 = sp.Eq(self.S1.diff(self.t), - (self.k_fls1s0 + self.k_ics1s0) * self.S1)
         return [eq1, eq2]
 
+    def parametric_solution(self):
+        # solved once in terms of symbolic rate constants and initial populations, cached on disk
+        k = {name: sp.Symbol(name, positive=True) for name in self.parameter_names}
+        A = TWO_STATE_MODEL.symbolic_rate_matrix(excitation=False)
+        P0 = sp.Matrix([k['S0_initial'], k['S1_initial']])
+        return load_parametric_solution('s2decay', A, P0, [k[name] for name in self.parameter_names])
+
     def solve_odes(self):
         # import s2ExcitationSolver with the provided constants
         exsolver = s2ExcitationSolver(k_abss0s1=self.k_abss0s1, k_fls1s0=self.k_fls1s0, k_ics1s0=self.k_ics1s0, time_pulse=self.time_pulse, num_photon=self.num_photon)
@@ -49,6 +60,18 @@ class s2DecaySolver:
         print(Fore.YELLOW + f" S0_initial: {S0_initial:>10.3e}")
         print(Fore.YELLOW + f" S1_initial: {S1_initial:>10.3e}")
 
+        parametric = self.parametric_solution()
+        values = {name: float(getattr(self, name)) for name in self.parameter_names[:-2]}
+        values.update(S0_initial=float(S0_initial), S1_initial=float(S1_initial))
+        if parametric.is_valid_for(values):
+            self.S0_sol, self.S1_sol = parametric.substitute(values, self.t)
+            self.solution_func = lambda t_values: parametric.evaluate(values, t_values)
+            self._limits = parametric.limits_at(values)
+            return
+
+        # repeated eigenvalues need the general solution from dsolve
+        self._limits = None
+
         solution = sp.dsolve(odes, ics=ics)
 
         self.S0_sol = solution[0].rhs  
@@ -69,9 +92,20 @@ class s2DecaySolver:
 
         self.S0_sol = sp.simplify(self.S0_sol).evalf()
         self.S1_sol = sp.simplify(self.S1_sol).evalf()
+        self.solution_func = compile_expressions([self.S0_sol, self.S1_sol], self.t)
+
+    def evaluate(self, t_values):
+        # populations of [S0, S1] for a scalar or a whole array of times
+        if self.solution_func is None:
+            self.solve_odes()
+        return self.solution_func(t_values)
 
     def calculate_limits(self):
         # calculate population limits as time goes to infinity
+        if self._limits is not None:
+            self.S0_limit, self.S1_limit = [sp.Float(value) for value in self._limits]
+            return
+
         self.S0_limit = sp.limit(self.S0_sol, self.t, sp.oo).evalf()
         self.S1_limit = sp.limit(self.S1_sol, self.t, sp.oo).evalf()
 
@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 
 import sympy as sp
-from colorama import init, Fore, Style
-
-init(autoreset=True)
+from colorama import Fore, Style
+from kinetics.model import TWO_STATE_MODEL
+from kinetics.symbolic import compile_expressions, load_parametric_solution
 
 class s2ExcitationSolver:
+    parameter_names = ('k_abss0s1', 'k_fls1s0', 'k_ics1s0', 'num_photon')
+
     def __init__(self, k_abss0s1=None, k_fls1s0=None, k_ics1s0=None, time_pulse=None, num_photon=None):
         self.t = sp.symbols('t')
         self.k_abss0s1 = sp.Symbol('k_abss0s1', positive=True)
@@ -27,6 +29,8 @@ class s2ExcitationSolver:
         self.S1_sol = None
         self.S0_limit = None
         self.S1_limit = None
+        self.solution_func = None
+        self._limits = None
 
     def _build_ode_equations(self):
         eq1 = sp.Eq(
@@ -37,7 +41,24 @@ class s2ExcitationSolver:
         )
         return [eq1, eq2]
 
+    def parametric_solution(self):
+        # solved once in terms of symbolic rate constants and cached on disk
+        k = {name: sp.Symbol(name, positive=True) for name in self.parameter_names}
+        A = TWO_STATE_MODEL.symbolic_rate_matrix(excitation=True)
+        P0 = sp.Matrix([k['num_photon'], 0])
+        return load_parametric_solution('s2excitation', A, P0, [k[name] for name in self.parameter_names])
+
     def solve_odes(self):
+        parametric = self.parametric_solution()
+        values = {name: float(getattr(self, name)) for name in self.parameter_names}
+        if parametric.is_valid_for(values):
+            self.S0_sol, self.S1_sol = parametric.substitute(values, self.t)
+            self.solution_func = lambda t_values: parametric.evaluate(values, t_values)
+            self._limits = parametric.limits_at(values)
+            return
+
+        # repeated eigenvalues need the general solution from dsolve
+        self._limits = None
         odes = self._build_ode_equations()
         # initial conditions
         ics = {
@@ -68,9 +89,14 @@ class s2ExcitationSolver:
         
         self.S0_sol = sp.simplify(self.S0_sol).evalf()
         self.S1_sol = sp.simplify(self.S1_sol).evalf()
+        self.solution_func = compile_expressions([self.S0_sol, self.S1_sol], self.t)
 
     def calculate_limits(self):
         # calculate population limits as time goes to infinity
+        if self._limits is not None:
+            self.S0_limit, self.S1_limit = [sp.Float(value) for value in self._limits]
+            return
+
         self.S0_limit = sp.limit(self.S0_sol, self.t, sp.oo).evalf()
         self.S1_limit = sp.limit(self.S1_sol, self.t, sp.oo).evalf()
 
@@ -99,15 +125,16 @@ class s2ExcitationSolver:
                 print(f" {label}:")
                 print(f" {sp.ccode(expr)} \n")
 
+    def evaluate(self, t_values):
+        # populations of [S0, S1] for a scalar or a whole array of times
+        if self.solution_func is None:
+            self.solve_odes()
+        return self.solution_func(t_values)
+
     def get_solution_at_time(self):
         if self.time_pulse is None:
             raise ValueError("Please set a valid pulse time.")
-        
-        if self.S0_sol is None or self.S1_sol is None:
-            self.solve_odes()
-        
-        S0_at_time = self.S0_sol.subs(self.t, self.time_pulse).evalf()
-        S1_at_time = self.S1_sol.subs(self.t, self.time_pulse).evalf()
-        
-        return S0_at_time, S1_at_time
 
+        S0_at_time, S1_at_time = self.evaluate(self.time_pulse)
+
+        return S0_at_time, S1_at_time
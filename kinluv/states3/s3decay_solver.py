@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 
 import sympy as sp
-from colorama import init, Fore, Style
+from colorama import Fore, Style
+from kinetics.model import THREE_STATE_MODEL
+from kinetics.symbolic import compile_expressions, load_parametric_solution
 from .s3excitation_solver import s3ExcitationSolver
 
-init(autoreset=True)  
-
 class s3DecaySolver:
+    parameter_names = ('k_fls1s0', 'k_ics1s0', 'k_iscs1t1', 'k_risct1s1', 'k_isct1s0', 'k_pht1s0', 'S0_initial', 'S1_initial', 'T1_initial')
+
     def __init__(self, k_abss0s1=None, k_fls1s0=None, k_ics1s0=None, k_iscs1t1=None,
                  k_risct1s1=None, k_isct1s0=None, k_pht1s0=None, time_pulse=None, num_photon=None):
 
@@ -34,6 +36,8 @@ class s3DecaySolver:
         self.S0_limit = None
         self.S1_limit = None
         self.T1_limit = None
+        self.solution_func = None
+        self._limits = None
 
     def _define_ode_equations(self):
         eq1 = sp.Eq(self.S0.diff(self.t),
@@ -49,6 +53,13 @@ class s3DecaySolver:
                      - self.T1 * (self.k_isct1s0 + self.k_pht1s0 + self.k_risct1s1))
         return [eq1, eq2, eq3]
 
+    def parametric_solution(self):
+        # solved once in terms of symbolic rate constants and initial populations, cached on disk
+        k = {name: sp.Symbol(name, positive=True) for name in self.parameter_names}
+        A = THREE_STATE_MODEL.symbolic_rate_matrix(excitation=False)
+        P0 = sp.Matrix([k['S0_initial'], k['S1_initial'], k['T1_initial']])
+        return load_parametric_solution('s3decay', A, P0, [k[name] for name in self.parameter_names])
+
     def solve_odes(self):
         exsolver = s3ExcitationSolver(k_abss0s1=self.k_abss0s1,
                                     k_fls1s0=self.k_fls1s0,
@@ -63,8 +74,6 @@ class s3DecaySolver:
 
         S0_initial, S1_initial, T1_initial = exsolver.get_solution_at_time()
 
-        odes = self._define_ode_equations()
-
         # initial conditions
         ics = {
             self.S0.subs(self.t, 0): S0_initial,
@@ -77,6 +86,18 @@ class s3DecaySolver:
         print(Fore.YELLOW + f" S1_initial: {S1_initial:>10.3e}") 
         print(Fore.YELLOW + f" T1_initial: {T1_initial:>10.3e}\n")
 
+        parametric = self.parametric_solution()
+        values = {name: float(getattr(self, name)) for name in self.parameter_names[:-3]}
+        values.update(S0_initial=float(S0_initial), S1_initial=float(S1_initial), T1_initial=float(T1_initial))
+        if parametric.is_valid_for(values):
+            self.S0_sol, self.S1_sol, self.T1_sol = parametric.substitute(values, self.t)
+            self.solution_func = lambda t_values: parametric.evaluate(values, t_values)
+            self._limits = parametric.limits_at(values)
+            return
+
+        # repeated eigenvalues need the general solution from dsolve
+        self._limits = None
+        odes = self._define_ode_equations()
         solution = sp.dsolve(odes, ics=ics)
 
         self.S0_sol = solution[0].rhs  
@@ -89,9 +110,20 @@ class s3DecaySolver:
         self.S0_sol = sp.simplify(self.S0_sol).evalf()
         self.S1_sol = sp.simplify(self.S1_sol).evalf()
         self.T1_sol = sp.simplify(self.T1_sol).evalf()
+        self.solution_func = compile_expressions([self.S0_sol, self.S1_sol, self.T1_sol], self.t)
+
+    def evaluate(self, t_values):
+        # populations of [S0, S1, T1] for a scalar or a whole array of times
+        if self.solution_func is None:
+            self.solve_odes()
+        return self.solution_func(t_values)
 
     def calculate_limits(self):
         # calculate population limits as time goes to infinity
+        if self._limits is not None:
+            self.S0_limit, self.S1_limit, self.T1_limit = [sp.Float(value) for value in self._limits]
+            return
+
         self.S0_limit = sp.limit(self.S0_sol, self.t, sp.oo).evalf()
         self.S1_limit = sp.limit(self.S1_sol, self.t, sp.oo).evalf()
         self.T1_limit = sp.limit(self.T1_sol, self.t, sp.oo).evalf()
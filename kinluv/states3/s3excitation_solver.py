@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 
 import sympy as sp
-from colorama import init, Fore, Style
-
-init(autoreset=True)
+from colorama import Fore, Style
+from kinetics.model import THREE_STATE_MODEL
+from kinetics.symbolic import compile_expressions, load_parametric_solution
 
 class s3ExcitationSolver:
+    parameter_names = ('k_abss0s1', 'k_fls1s0', 'k_ics1s0', 'k_iscs1t1', 'k_risct1s1', 'k_isct1s0', 'k_pht1s0', 'num_photon')
+
     def __init__(self, k_abss0s1=None, k_fls1s0=None, k_ics1s0=None, k_iscs1t1=None, k_risct1s1=None, k_isct1s0=None, k_pht1s0=None, time_pulse=None, num_photon=None):
         self.t = sp.symbols('t')
 
@@ -31,6 +33,8 @@ class s3ExcitationSolver:
         self.S0_limit = None
         self.S1_limit = None
         self.T1_limit = None
+        self.solution_func = None
+        self._limits = None
 
     def _define_ode_equations(self):
         eq1 = sp.Eq(
@@ -47,7 +51,24 @@ class s3ExcitationSolver:
         )
         return [eq1, eq2, eq3]
 
+    def parametric_solution(self):
+        # solved once in terms of symbolic rate constants and cached on disk
+        k = {name: sp.Symbol(name, positive=True) for name in self.parameter_names}
+        A = THREE_STATE_MODEL.symbolic_rate_matrix(excitation=True)
+        P0 = sp.Matrix([k['num_photon'], 0, 0])
+        return load_parametric_solution('s3excitation', A, P0, [k[name] for name in self.parameter_names])
+
     def solve_odes(self):
+        parametric = self.parametric_solution()
+        values = {name: float(getattr(self, name)) for name in self.parameter_names}
+        if parametric.is_valid_for(values):
+            self.S0_sol, self.S1_sol, self.T1_sol = parametric.substitute(values, self.t)
+            self.solution_func = lambda t_values: parametric.evaluate(values, t_values)
+            self._limits = parametric.limits_at(values)
+            return
+
+        # repeated eigenvalues need the general solution from dsolve
+        self._limits = None
         odes = self._define_ode_equations()
         # initial conditions 
         ics = {
@@ -68,8 +89,19 @@ class s3ExcitationSolver:
         self.S0_sol = sp.simplify(self.S0_sol).evalf()
         self.S1_sol = sp.simplify(self.S1_sol).evalf()
         self.T1_sol = sp.simplify(self.T1_sol).evalf()
+        self.solution_func = compile_expressions([self.S0_sol, self.S1_sol, self.T1_sol], self.t)
+
+    def evaluate(self, t_values):
+        # populations of [S0, S1, T1] for a scalar or a whole array of times
+        if self.solution_func is None:
+            self.solve_odes()
+        return self.solution_func(t_values)
 
     def calculate_limits(self):
+        if self._limits is not None:
+            self.S0_limit, self.S1_limit, self.T1_limit = [sp.Float(value) for value in self._limits]
+            return
+
         self.S0_limit = sp.limit(self.S0_sol, self.t, sp.oo).evalf()
         self.S1_limit = sp.limit(self.S1_sol, self.t, sp.oo).evalf()
         self.T1_limit = sp.limit(self.T1_sol, self.t, sp.oo).evalf()
@@ -110,13 +142,7 @@ class s3ExcitationSolver:
         if self.time_pulse is None:
             raise ValueError("Please set a valid pulse time.")
 
-        if self.S0_sol is None or self.S1_sol is None or self.T1_sol is None:
-            self.solve_odes()
-
-        S0_at_time = self.S0_sol.subs(self.t, self.time_pulse).evalf()
-        S1_at_time = self.S1_sol.subs(self.t, self.time_pulse).evalf()
-        T1_at_time = self.T1_sol.subs(self.t, self.time_pulse).evalf()
+        S0_at_time, S1_at_time, T1_at_time = self.evaluate(self.time_pulse)
 
         return S0_at_time, S1_at_time, T1_at_time
 
-
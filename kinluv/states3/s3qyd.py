@@ -1,9 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from colorama import Fore, Style, init
-import sympy as sp
-
-init(autoreset=True)
+from colorama import Fore
 
 class s3QuantumYieldCalculator:
     def __init__(self, k_abss0s1=None, k_fls1s0=None, k_ics1s0=None, k_iscs1t1=None,
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from main import read_params_from_inp
+from kinetics.cache import PopulationCache, excitation_cache, excitation_runs
+from kinetics.model import FIVE_STATE_MODEL
+from kinetics.pipeline import run_kinetics
+from kinetics.solvers import DecaySolver
+from test_lifetimes import EXAMPLE_INPUT
+
+
+def test_population_cache_evicts_least_recently_used():
+    cache = PopulationCache(maxsize=2)
+    cache.get_or_compute('a', lambda: [1.0])
+    cache.get_or_compute('b', lambda: [2.0])
+    assert cache.get_or_compute('a', lambda: [0.0]) == (1.0,)
+    cache.get_or_compute('c', lambda: [3.0])
+    assert len(cache) == 2 and cache.hits == 1 and cache.misses == 3
+    # 'b' was the least recently used entry
+    assert cache.get_or_compute('b', lambda: [4.0]) == (4.0,)
+    assert cache.get_or_compute('a', lambda: [5.0]) == (5.0,)
+
+
+def run_five_states(results_folder, rates=None, **options):
+    params = read_params_from_inp(EXAMPLE_INPUT)
+    rate_constants = {name: params[name] for name in FIVE_STATE_MODEL.rate_names}
+    rate_constants.update(rates or {})
+    return run_kinetics(
+        FIVE_STATE_MODEL, rate_constants, params['time_pulse'], params['num_photon'], params['time_excitation'],
+        options.pop('time_decay', params['time_decay']), str(results_folder), engine='expm', data_format='npz',
+        plot=False, quiet=True, **options
+    )
+
+
+def test_decay_settings_reuse_the_excitation_phase(tmp_path):
+    excitation_runs.clear()
+    first = run_five_states(tmp_path / 'first')
+    second = run_five_states(tmp_path / 'second', time_decay=1e-5, decay_max_step=1e-9)
+    assert first.profile['excitation_cache'] == {'hits': 0, 'misses': 1}
+    assert second.profile['excitation_cache'] == {'hits': 1, 'misses': 0}
+    assert np.array_equal(first.y_excitation, second.y_excitation)
+
+    # the decay channels stay open during the pulse, so any rate change is a new excitation phase
+    third = run_five_states(tmp_path / 'third', rates={'k_pht1s0': 2e3})
+    assert third.profile['excitation_cache'] == {'hits': 0, 'misses': 1}
+
+
+def test_decay_solver_keys_on_excitation_rates_only():
+    excitation_cache.clear()
+    params = read_params_from_inp(EXAMPLE_INPUT)
+    rate_constants = {name: params[name] for name in FIVE_STATE_MODEL.rate_names}
+    solver = DecaySolver(params['time_pulse'], params['num_photon'], model=FIVE_STATE_MODEL, **rate_constants)
+    t_eval = np.logspace(-9, -6, 50)
+    solver.solve_numerically(t_span=(0, 1e-6), t_eval=t_eval, engine='expm')
+    # a longer decay and the rates of other models leave the excitation phase alone
+    other_rates = dict(rate_constants, k_unused=1.0)
+    solver.solve_numerically(t_span=(0, 1e-5), t_eval=t_eval, rate_constants=other_rates, engine='expm')
+    assert (excitation_cache.hits, excitation_cache.misses) == (1, 1)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from kinetics.decay_analysis import decompose_decay, decompose_decays
+
+LIFETIMES = np.array([2e-8, 1.5e-7, 1e-6])
+AMPLITUDES = np.array([5000.0, 800.0, 100.0])
+
+
+def histogram(lifetimes=LIFETIMES, amplitudes=AMPLITUDES, offset=10.0, seed=None):
+    t = np.linspace(0.0, 5e-6, 4096)
+    y = np.exp(-t[:, None] / lifetimes[None, :]) @ amplitudes + offset
+    if seed is not None:
+        y = np.random.default_rng(seed).poisson(y).astype(np.float64)
+    return t, y
+
+
+def test_recovers_exact_lifetimes_fastest_first():
+    t, y = histogram()
+    result = decompose_decay(t, y, weighting=None)
+    assert result.order == 3
+    assert np.allclose(result.lifetimes, LIFETIMES, rtol=1e-4)
+    assert np.allclose(result.amplitudes, AMPLITUDES, rtol=1e-3)
+    assert np.isclose(result.offset, 10.0, rtol=1e-3)
+
+
+def test_recovers_lifetimes_from_counts():
+    t, y = histogram(seed=1)
+    result = decompose_decay(t, y)
+    assert result.order == 3
+    assert np.all(np.diff(result.lifetimes) > 0)
+    assert np.allclose(result.lifetimes, LIFETIMES, rtol=0.05)
+    assert np.allclose(result.amplitudes, AMPLITUDES, rtol=0.05)
+
+
+def test_batch_matches_single_decays():
+    t, y_a = histogram()
+    _, y_b = histogram(lifetimes=LIFETIMES[:2], amplitudes=AMPLITUDES[:2])
+    results = decompose_decays(t, np.vstack((y_a, y_b)), weighting=None)
+    assert [result.order for result in results] == [3, 2]
+    assert np.allclose(results[1].lifetimes, LIFETIMES[:2], rtol=1e-4)
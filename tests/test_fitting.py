@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+import os
+import numpy as np
+import pytest
+from main import read_params_from_inp
+from kinetics.fitting import fit_two_exponentials_varpro, initial_guess, log_residuals
+from kinetics.storage import read_kinetics_text
+from test_lifetimes import EXAMPLE_INPUT
+
+EXAMPLES = os.path.dirname(EXAMPLE_INPUT)
+
+# (A1, tau1, A2, tau2, C) of the differential-evolution fit, as logged with the stored example results
+LEGACY_FITS = {
+    4: (1.357e-03, 1.887e-06, 9.991e-01, 4.725e-08, 5.434e-13),
+    5: (5.569e-01, 5.656e-08, 1.592e-03, 1.890e-06, 3.826e-13),
+}
+
+
+def short_first(A1, tau1, A2, tau2, C):
+    return (A1, tau1, A2, tau2, C) if tau1 <= tau2 else (A2, tau2, A1, tau1, C)
+
+
+@pytest.mark.parametrize('n_states', sorted(LEGACY_FITS))
+def test_varpro_matches_the_legacy_fit(n_states):
+    num_photon = read_params_from_inp(EXAMPLE_INPUT)['num_photon']
+    data = read_kinetics_text(os.path.join(EXAMPLES, f'results_{n_states}states', 'kinetics_data.out'))
+    t_data, s1_data = data['t_decay'], data['y_decay'][data['states'].index('S1')]
+
+    x0 = initial_guess(t_data, s1_data, num_photon)
+    A1, log10_tau1, A2, log10_tau2, C = fit_two_exponentials_varpro(t_data, s1_data, num_photon, x0=x0)
+    legacy = short_first(*LEGACY_FITS[n_states])
+    assert log10_tau1 < log10_tau2
+    assert np.allclose([10 ** log10_tau1, 10 ** log10_tau2], [legacy[1], legacy[3]], rtol=0.02)
+    assert np.allclose([A1, A2], [legacy[0], legacy[2]], rtol=0.1)
+
+    # at least as good a fit of the log-decay as the global optimizer
+    legacy_params = [legacy[0], np.log10(legacy[1]), legacy[2], np.log10(legacy[3]), legacy[4]]
+    cost = np.mean(log_residuals([A1, log10_tau1, A2, log10_tau2, C], t_data, s1_data) ** 2)
+    assert cost <= 1.01 * np.mean(log_residuals(legacy_params, t_data, s1_data) ** 2)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+import os
+import numpy as np
+from main import read_params_from_inp
+from kinetics.lifetimes import decay_modes, emission_lifetimes
+from kinetics.model import FIVE_STATE_MODEL, THREE_STATE_MODEL
+from kinetics.propagator import MatrixExponentialPropagator
+from kinetics.sweep import evaluate_parameters
+
+EXAMPLE_INPUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples', 'inp')
+
+
+def five_state_example():
+    params = read_params_from_inp(EXAMPLE_INPUT)
+    rate_constants = {name: params[name] for name in FIVE_STATE_MODEL.rate_names}
+    propagator = MatrixExponentialPropagator(FIVE_STATE_MODEL.rate_matrix(rate_constants, excitation=True))
+    pulse_end = propagator.propagate(FIVE_STATE_MODEL.initial_populations(params['num_photon']), params['time_pulse'])
+    return params, rate_constants, pulse_end
+
+
+def test_rise_modes_are_not_emission_lifetimes():
+    # the S2 -> S1 feeding is a fast mode with a large negative emission amplitude
+    params, rate_constants, pulse_end = five_state_example()
+    modes = decay_modes(FIVE_STATE_MODEL, rate_constants, pulse_end)
+    rise = [mode.lifetime for mode in modes if mode.emission_amplitude < 0]
+    assert rise and min(rise) < 1e-9
+
+    lifetimes = emission_lifetimes(FIVE_STATE_MODEL, rate_constants, pulse_end)
+    assert not np.isin(rise, lifetimes).any()
+
+
+def test_sweep_prompt_and_delayed_lifetimes():
+    params, _, _ = five_state_example()
+    result = evaluate_parameters(FIVE_STATE_MODEL, params)
+    assert np.isclose(result['tau_prompt'], 4.73e-8, rtol=1e-3)
+    assert np.isclose(result['tau_delayed'], 1.907e-6, rtol=1e-3)
+
+
+def three_state_modes(**rates):
+    params = read_params_from_inp(EXAMPLE_INPUT)
+    rate_constants = {name: params[name] for name in THREE_STATE_MODEL.rate_names}
+    rate_constants.update(rates)
+    y0 = np.array([0.0, 0.9, 0.1])
+    ground = THREE_STATE_MODEL.index(THREE_STATE_MODEL.ground_state)
+    excited = [idx for idx in range(THREE_STATE_MODEL.n_states) if idx != ground]
+    A = THREE_STATE_MODEL.rate_matrix(rate_constants, excitation=False)[np.ix_(excited, excited)]
+    return rate_constants, y0, A, excited, decay_modes(THREE_STATE_MODEL, rate_constants, y0)
+
+
+def test_equal_s1_and_t1_rates_without_risc():
+    # a defective excited block: one mode of rate 3e7 that also carries t * exp(-rate t) terms
+    rate_constants, y0, A, excited, modes = three_state_modes(
+        k_risct1s1=0.0, k_fls1s0=1e7, k_ics1s0=1e7, k_iscs1t1=1e7, k_isct1s0=2e7, k_pht1s0=1e7
+    )
+    assert len(modes) == 1 and np.isclose(modes[0].lifetime, 1 / 3e7)
+    integrated = -np.linalg.solve(A, y0[excited])
+    emissive = excited.index(THREE_STATE_MODEL.index(THREE_STATE_MODEL.emissive_state))
+    assert np.isclose(modes[0].emission_yield, rate_constants['k_fls1s0'] * integrated[emissive])
+    assert np.isclose(modes[0].emission_fraction, 1.0)
+
+
+def test_excited_state_without_outgoing_rate():
+    _, _, _, _, modes = three_state_modes(k_risct1s1=0.0, k_isct1s0=0.0, k_pht1s0=0.0)
+    trapped = [mode for mode in modes if mode.rate == 0]
+    assert len(trapped) == 1 and np.isinf(trapped[0].lifetime)
+    decaying = [mode for mode in modes if mode.rate > 0]
+    assert np.isclose(sum(mode.emission_fraction for mode in decaying), 1.0)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+from scipy import sparse
+from scipy.linalg import expm
+from main import read_params_from_inp
+from kinetics import propagator
+from kinetics.model import FIVE_STATE_MODEL, THREE_STATE_MODEL
+from kinetics.propagator import KrylovPropagator, MatrixExponentialPropagator, propagate_batch, propagate_krylov
+from kinetics.solvers import solve_batch
+from test_lifetimes import EXAMPLE_INPUT
+
+
+def stiff_chain(n):
+    # S_0 -> S_1 -> ... -> S_(n-1) with rates spread over six decades and an absorbing last state
+    rates = np.logspace(6, 12, n - 1)
+    return sparse.diags([np.append(-rates, 0.0), rates], [0, -1], format='csr')
+
+
+def test_krylov_never_densifies_a_large_chain(monkeypatch):
+    A = stiff_chain(600)
+    y0 = np.zeros(600)
+    y0[0] = 1.0
+    t_eval = np.logspace(-12, -3, 200)
+    checked = [0, 80, 140, 199]
+    exact = np.column_stack([expm(A.toarray() * t_eval[idx]) @ y0 for idx in checked])
+
+    def densify(*args, **kwargs):
+        raise AssertionError("The krylov engine densified the rate matrix.")
+
+    for cls in (sparse.csr_matrix, sparse.csc_matrix, sparse.coo_matrix):
+        monkeypatch.setattr(cls, 'toarray', densify)
+        monkeypatch.setattr(cls, 'todense', densify)
+    monkeypatch.setattr(propagator, 'MatrixExponentialPropagator', densify)
+
+    solution = propagate_krylov(A, (0.0, t_eval[-1]), y0, t_eval)
+    assert solution.nlu > 0
+    assert np.allclose(solution.y[:, checked], exact, rtol=0, atol=1e-10)
+    assert np.allclose(solution.y.sum(axis=0), 1.0, rtol=0, atol=1e-10)
+
+
+def test_krylov_steps_match_the_matrix_exponential():
+    # long steps of a small model go through the dense shifted solves, of a large one through splu
+    for n in (5, 40):
+        A = stiff_chain(n)
+        y0 = np.linspace(1.0, 0.0, n)
+        for dt in (1e-13, 1e-9, 1e-6, 1e-3):
+            step = KrylovPropagator(A).step(y0, dt)
+            assert np.allclose(step, expm(A.toarray() * dt) @ y0, rtol=0, atol=1e-10)
+
+
+def rate_sets(model, n_sets, **fixed):
+    # the example rates scaled by up to a decade either way, one set per row
+    params = read_params_from_inp(EXAMPLE_INPUT)
+    rng = np.random.default_rng(3)
+    rates = {name: params[name] * 10.0 ** rng.uniform(-1, 1, n_sets) for name in model.rate_names}
+    for name, value in fixed.items():
+        rates[name][0] = value
+    return params, rates
+
+
+@pytest.mark.parametrize('chunk_size', [None, 1, 5])
+def test_propagate_batch_matches_single_propagators(chunk_size):
+    # the first set has equal S1 and T1 decay rates without RISC, a defective matrix that the batch
+    # hands to the single propagator
+    _, rates = rate_sets(
+        THREE_STATE_MODEL, 12, k_risct1s1=0.0, k_fls1s0=1e7, k_ics1s0=1e7, k_iscs1t1=1e7, k_isct1s0=2e7, k_pht1s0=1e7
+    )
+    A = THREE_STATE_MODEL.rate_matrices(rates, excitation=False)
+    y0 = np.random.default_rng(4).random((12, 3))
+    t = np.logspace(-12, -3, 50)
+    batch = propagate_batch(A, y0, t, chunk_size=chunk_size)
+    for idx in range(12):
+        single = MatrixExponentialPropagator(A[idx]).propagate(y0[idx], t)
+        assert np.allclose(batch[idx], single, rtol=1e-9, atol=1e-14)
+
+
+def test_solve_batch_matches_the_single_set_solution():
+    params, rates = rate_sets(FIVE_STATE_MODEL, 8)
+    t_eval = np.logspace(-12, -3, 60)
+    pulse_end, decay = solve_batch(FIVE_STATE_MODEL, rates, params['time_pulse'], params['num_photon'], t_eval, chunk_size=3)
+    y0 = FIVE_STATE_MODEL.initial_populations(params['num_photon'])
+    for idx in range(8):
+        rate_constants = {name: values[idx] for name, values in rates.items()}
+        excitation = MatrixExponentialPropagator(FIVE_STATE_MODEL.rate_matrix(rate_constants, excitation=True))
+        expected_pulse_end = excitation.propagate(y0, params['time_pulse'])
+        decay_propagator = MatrixExponentialPropagator(FIVE_STATE_MODEL.rate_matrix(rate_constants, excitation=False))
+        assert np.allclose(pulse_end[idx], expected_pulse_end, rtol=1e-9, atol=1e-14)
+        assert np.allclose(decay[idx], decay_propagator.propagate(expected_pulse_end, t_eval), rtol=1e-9, atol=1e-14)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import io
+import numpy as np
+import pytest
+from kinetics.storage import (
+    DATA_FORMATS, format_scientific, kinetics_data_path, load_kinetics_data, save_kinetics_data, write_text_block
+)
+
+STATES = ['S0', 'S1', 'T1']
+
+
+def kinetics_arrays():
+    rng = np.random.default_rng(0)
+    t_excitation = np.logspace(-15, -9, 300)
+    t_decay = np.logspace(-13, -3, 500)
+    return {
+        't_excitation': t_excitation, 'y_excitation': rng.random((3, t_excitation.size)),
+        't_decay': t_decay, 'y_decay': rng.random((3, t_decay.size)) * 10.0 ** -rng.integers(0, 300, (3, t_decay.size)),
+    }
+
+
+@pytest.mark.parametrize('data_format', [fmt for fmt in DATA_FORMATS if fmt != 'text'])
+@pytest.mark.parametrize('mmap', [True, False])
+def test_binary_formats_round_trip(tmp_path, data_format, mmap):
+    arrays = kinetics_arrays()
+    data_path = kinetics_data_path(str(tmp_path), data_format)
+    save_kinetics_data(data_path, STATES, data_format=data_format, **arrays)
+
+    data = load_kinetics_data(data_path, mmap=mmap)
+    assert data['states'] == STATES
+    for name, array in arrays.items():
+        assert data[name].dtype == np.float64 and np.array_equal(data[name], array)
+
+
+def test_text_format_round_trip(tmp_path):
+    arrays = kinetics_arrays()
+    data_path = kinetics_data_path(str(tmp_path), 'text')
+    save_kinetics_data(data_path, STATES, **arrays)
+
+    data = load_kinetics_data(data_path)
+    assert data['states'] == STATES
+    for name, array in arrays.items():
+        # the table keeps 5 significant digits of the times and 7 of the populations
+        assert np.allclose(data[name], array, rtol=1e-4 if name.startswith('t_') else 1e-6, atol=0)
+
+
+def test_decimated_formats_keep_the_same_samples(tmp_path):
+    arrays = kinetics_arrays()
+    loaded = {}
+    for data_format in DATA_FORMATS:
+        data_path = kinetics_data_path(str(tmp_path), data_format)
+        save_kinetics_data(data_path, STATES, data_format=data_format, log_points=50, **arrays)
+        loaded[data_format] = load_kinetics_data(data_path)
+    for name in arrays:
+        assert np.array_equal(loaded['npz'][name], loaded['raw'][name])
+        assert loaded['text'][name].shape == loaded['npz'][name].shape
+    assert loaded['npz']['t_decay'][0] == arrays['t_decay'][0] and loaded['npz']['t_decay'][-1] == arrays['t_decay'][-1]
+
+
+def awkward_values():
+    # powers of ten and their neighbours, exact round-half cases, subnormals, three-digit exponents
+    # and the non-finite values, next to plain random numbers over the whole exponent range
+    rng = np.random.default_rng(1)
+    powers = 10.0 ** np.arange(-310, 309, dtype=np.float64)
+    values = [
+        powers, np.nextafter(powers, 0), np.nextafter(powers, np.inf),
+        np.array([0.0, -0.0, 1.25, 2.5e-5, 9.9999995, 9.99999949999, 0.5, 5e-324, 2.2e-308, 1.7976931348623157e308]),
+        np.array([np.nan, np.inf, -np.inf]),
+        rng.random(5000) * 10.0 ** rng.integers(-320, 308, 5000),
+        -rng.random(5000) * 10.0 ** rng.integers(-20, 20, 5000),
+        np.round(rng.random(5000), 7),
+    ]
+    return np.concatenate(values)
+
+
+@pytest.mark.parametrize('precision, width', [(4, 15), (6, 20), (10, 19)])
+def test_format_scientific_matches_format(precision, width):
+    values = awkward_values()
+    expected = "".join(format(value, f'<{width}.{precision}e') for value in values)
+    assert format_scientific(values, precision, width).tobytes().decode('ascii') == expected
+
+
+def test_write_text_block_matches_the_original_rows():
+    values = awkward_values()
+    rng = np.random.default_rng(2)
+    t_values = np.sort(np.abs(values[np.isfinite(values)]))
+    y_values = np.vstack((rng.permutation(values)[:t_values.size], rng.random(t_values.size)))
+    file = io.StringIO()
+    # a small chunk size puts several chunk boundaries into the block
+    write_text_block(file, t_values, y_values, chunk_size=1000)
+    expected = "".join(
+        f"{t:<15.4e}" + "".join(f"{p:<20.6e}" for p in y_values[:, idx]) + "\n" for idx, t in enumerate(t_values)
+    )
+    assert file.getvalue() == expected
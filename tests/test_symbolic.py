@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import numpy as np
+import sympy as sp
+from main import read_params_from_inp
+from kinetics import symbolic
+from kinetics.model import THREE_STATE_MODEL, TWO_STATE_MODEL
+from kinetics.propagator import MatrixExponentialPropagator
+from states3 import s3DecaySolver
+from test_lifetimes import EXAMPLE_INPUT
+
+
+def test_repeated_decay_rates_stay_finite():
+    # equal S1 and T1 decay rates without RISC take the dsolve path, whose terms carry exp(+k*t) factors
+    params = read_params_from_inp(EXAMPLE_INPUT)
+    rate_constants = {name: params[name] for name in THREE_STATE_MODEL.rate_names}
+    rate_constants.update(k_risct1s1=0.0, k_fls1s0=1e7, k_ics1s0=1e7, k_iscs1t1=1e7, k_isct1s0=2e7, k_pht1s0=1e7)
+    solver = s3DecaySolver(time_pulse=params['time_pulse'], num_photon=params['num_photon'], **rate_constants)
+    solver.solve_odes()
+    assert solver._limits is None
+
+    t_values = np.logspace(-12, -3, 200)
+    populations = solver.evaluate(t_values)
+    assert np.all(np.isfinite(populations))
+
+    propagator = MatrixExponentialPropagator(THREE_STATE_MODEL.rate_matrix(rate_constants, excitation=False))
+    expected = propagator.propagate(solver.evaluate(0.0), t_values)
+    assert np.allclose(populations, expected, rtol=1e-6, atol=1e-12)
+
+
+def count_solves(monkeypatch, tmp_path):
+    monkeypatch.setenv('KINLUV_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(symbolic, '_loaded_solutions', {})
+    solves = []
+    solve = symbolic.solve_linear_system
+    monkeypatch.setattr(symbolic, 'solve_linear_system', lambda A, P0: solves.append(A) or solve(A, P0))
+    return solves
+
+
+def load_decay_solution(model, name):
+    A = model.symbolic_rate_matrix(excitation=False)
+    parameters = sorted(A.free_symbols, key=lambda p: p.name) + [sp.Symbol(f"{s}_initial", positive=True) for s in model.states]
+    solution = symbolic.load_parametric_solution(name, A, sp.Matrix(parameters[-model.n_states:]), parameters)
+    values = {p.name: 1e7 * (idx + 1) for idx, p in enumerate(parameters)}
+    values.update({f"{s}_initial": 1.0 / model.n_states for s in model.states})
+    return solution, values
+
+
+def test_parametric_cache_hits_and_misses(monkeypatch, tmp_path):
+    solves = count_solves(monkeypatch, tmp_path)
+    solution, values = load_decay_solution(THREE_STATE_MODEL, 's3test')
+    two_state, _ = load_decay_solution(TWO_STATE_MODEL, 's2test')
+    assert len(solves) == 2 and len(os.listdir(tmp_path)) == 2
+
+    # a fresh process reads both back from disk without solving again
+    monkeypatch.setattr(symbolic, '_loaded_solutions', {})
+    cached, _ = load_decay_solution(THREE_STATE_MODEL, 's3test')
+    assert len(solves) == 2
+    assert np.allclose(cached.evaluate(values, [0.0, 1e-8, 1e-6]), solution.evaluate(values, [0.0, 1e-8, 1e-6]))
+
+
+def test_parametric_cache_runs_no_code(monkeypatch, tmp_path):
+    solves = count_solves(monkeypatch, tmp_path)
+    load_decay_solution(THREE_STATE_MODEL, 's3test')
+    (path,) = [os.path.join(tmp_path, name) for name in os.listdir(tmp_path)]
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    marker = os.path.join(tmp_path, 'executed')
+    data['eigenvalues'][0] = f"__import__('pathlib').Path({marker!r}).touch()"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+    monkeypatch.setattr(symbolic, '_loaded_solutions', {})
+    load_decay_solution(THREE_STATE_MODEL, 's3test')
+    assert len(solves) == 2 and not os.path.exists(marker)